@@ -0,0 +1,236 @@
+"""
+A local stand-in for the Groq OpenAI-compatible API.
+
+Serves chat/completions (plain and SSE streaming) and audio/transcriptions
+(verbose_json with segments) with configurable latency, error rate and 429
+rate, so the pipeline can be loaded without touching the real service.
+
+    python -m benchmarks.fake_groq --port 8099 --latency-ms 300 --rate-limit-rate 0.05
+
+GET /stats returns request and injected-failure counters.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "energy entropy system state model lecture example theorem proof data "
+    "function process result value method analysis structure network signal "
+    "memory cell protein market policy theory equation vector field wave"
+).split()
+# WAV payloads in the benchmark are 16 kHz mono 16-bit
+AUDIO_BYTES_PER_SECOND = 32000
+
+
+class FakeGroq:
+    def __init__(self, latency_ms=200, jitter_ms=50, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1.0, tokens_per_second=200, completion_tokens=150,
+                 transcribe_rtf=0.02, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        # Seconds of processing per second of audio, on top of the latency
+        self.transcribe_rtf = transcribe_rtf
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def roll(self):
+        """
+        Picks the outcome of one request: "429", "500" or "ok".
+        """
+        with self.lock:
+            r = self.random.random()
+        if r < self.rate_limit_rate:
+            return "429"
+        if r < self.rate_limit_rate + self.error_rate:
+            return "500"
+        return "ok"
+
+    def delay(self, extra=0.0):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, (self.latency_ms + jitter) / 1000 + extra))
+
+    def words(self, n, seed):
+        rng = random.Random(seed)
+        return [rng.choice(WORDS) for _ in range(n)]
+
+    def completion(self, prompt):
+        seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        if "flashcards" in prompt.lower():
+            # Each card quotes a few words of the lecture as its source
+            text = prompt.rsplit("\n\n", 1)[-1].split()
+            rng = random.Random(seed)
+            cards = []
+            for i in range(10):
+                start = rng.randrange(max(1, len(text) - 8))
+                cards.append({
+                    "question": f"What is {' '.join(self.words(3, seed + str(i)))}?",
+                    "answer": " ".join(self.words(12, seed + str(-i))),
+                    "source": " ".join(text[start:start + 8]),
+                })
+            return json.dumps({"flashcards": cards})
+        return " ".join(self.words(self.completion_tokens, seed))
+
+    def transcript(self, audio, duration):
+        # Unique per upload so the result caches downstream do not short-circuit
+        seed = hashlib.sha256(audio).hexdigest()
+        segments, words, start = [], [], 0.0
+        while start < duration:
+            end = min(start + 5.0, duration)
+            text = " ".join(self.words(12, f"{seed}{start}"))
+            segments.append({"id": len(segments), "start": start, "end": end, "text": " " + text})
+            words.append(text)
+            start = end
+        return {"text": " ".join(words), "segments": segments, "duration": duration}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeGroq/1.0"
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            return self.send_json(200, self.fake.stats())
+        self.send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        endpoint = "chat" if self.path.endswith("/chat/completions") else (
+            "transcribe" if self.path.endswith("/audio/transcriptions") else None
+        )
+        if endpoint is None:
+            return self.send_json(404, {"error": {"message": "not found"}})
+        self.fake.count(f"{endpoint}_requests")
+
+        outcome = self.fake.roll()
+        if outcome == "429":
+            self.fake.count(f"{endpoint}_429")
+            return self.send_json(429, {"error": {"message": "Rate limit reached (injected)"}},
+                                  {"Retry-After": f"{self.fake.retry_after:g}"})
+        if outcome == "500":
+            self.fake.count(f"{endpoint}_500")
+            self.fake.delay()
+            return self.send_json(500, {"error": {"message": "Internal error (injected)"}})
+
+        if endpoint == "transcribe":
+            return self.transcribe(body)
+        return self.chat(json.loads(body or b"{}"))
+
+    def transcribe(self, body):
+        # Multipart parsing is not needed; the payload size stands in for the duration
+        duration = max(1.0, len(body) / AUDIO_BYTES_PER_SECOND)
+        self.fake.delay(duration * self.fake.transcribe_rtf)
+        self.send_json(200, self.fake.transcript(body, duration))
+
+    def chat(self, payload):
+        prompt = "\n".join(str(m.get("content", "")) for m in payload.get("messages", []))
+        text = self.fake.completion(prompt)
+        self.fake.delay()
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4}
+        if not payload.get("stream"):
+            return self.send_json(200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = re.findall(r"\S+\s*", text)
+        interval = 1.0 / self.fake.tokens_per_second if self.fake.tokens_per_second else 0
+        model = payload.get("model")
+        for piece in pieces:
+            self.write_event({"model": model, "choices": [{"index": 0, "delta": {"content": piece}}]})
+            if interval:
+                time.sleep(interval)
+        # Like Groq, the last chunk carries the usage under x_groq
+        self.write_event({
+            "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"usage": usage},
+        })
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_event(self, data):
+        self.write_chunk(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def make_server(host="127.0.0.1", port=0, **options):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.fake = FakeGroq(**options)
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=200, help="time to first byte")
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with a 429")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="streaming speed")
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--transcribe-rtf", type=float, default=0.02,
+                        help="seconds of transcription work per second of audio")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    options = vars(args).copy()
+    host, port = options.pop("host"), options.pop("port")
+    server = make_server(host, port, **options)
+    print(f"Fake Groq listening on http://{host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
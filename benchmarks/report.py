@@ -0,0 +1,93 @@
+"""
+Summary statistics for a benchmark run and comparison against a baseline.
+"""
+import json
+import math
+
+PERCENTILES = (50, 95, 99)
+# Parameters that must match for a comparison with the baseline to mean anything
+COMPARABLE_PARAMS = (
+    "users", "lectures_per_user", "audio_seconds", "latency_ms", "error_rate",
+    "rate_limit_rate", "tokens_per_second", "io_concurrency", "cpu_concurrency", "database",
+)
+
+
+def percentile(values, p):
+    """
+    Linear-interpolated percentile of an already sorted list.
+    """
+    if not values:
+        return None
+    k = (len(values) - 1) * p / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(values):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return {"count": 0}
+    summary = {"count": len(values), "mean": round(sum(values) / len(values), 1)}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = round(percentile(values, p), 1)
+    summary["max"] = round(values[-1], 1)
+    return summary
+
+
+def compare(report, baseline, tolerance, min_delta_ms=0):
+    """
+    Returns (rows, regressions). Latencies regress when they grow by more
+    than tolerance and by at least min_delta_ms, throughput when it drops
+    by more than tolerance.
+    """
+    rows, regressions = [], []
+
+    def check(name, current, previous, higher_is_better=False):
+        if current is None or not previous:
+            return
+        change = (current - previous) / previous
+        worse = -change if higher_is_better else change
+        row = (name, previous, current, change)
+        rows.append(row)
+        if worse > tolerance and (higher_is_better or current - previous >= min_delta_ms):
+            regressions.append(row)
+
+    for group in ("stages", "queue_wait", "websocket"):
+        for name, stats in report.get(group, {}).items():
+            old = baseline.get(group, {}).get(name, {})
+            for p in PERCENTILES:
+                check(f"{group}.{name}.p{p}", stats.get(f"p{p}"), old.get(f"p{p}"))
+    check("throughput.per_minute", report["throughput"]["per_minute"],
+          baseline.get("throughput", {}).get("per_minute"), higher_is_better=True)
+    return rows, regressions
+
+
+def mismatched_params(report, baseline):
+    params, old = report.get("params", {}), baseline.get("params", {})
+    return [name for name in COMPARABLE_PARAMS if params.get(name) != old.get(name)]
+
+
+def print_report(report):
+    t = report["throughput"]
+    print(f"\nWorkflows: {t['completed']} completed, {t['failed']} failed in {t['duration_s']}s "
+          f"({t['per_minute']}/min)")
+    for group in ("stages", "queue_wait", "websocket"):
+        print(f"\n{group:<22}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+        for name, stats in report[group].items():
+            if stats.get("count"):
+                print(f"  {name:<20}{stats['count']:>5}" + "".join(
+                    f"{stats[k]:>10.0f}" for k in ("p50", "p95", "p99", "max")))
+    print("\nworkers")
+    for queue, w in report["workers"].items():
+        print(f"  {queue:<20}busy {w['busy_s']:>8.1f}s of {w['capacity_s']:>8.1f}s  "
+              f"utilization {w['utilization']:.0%}")
+    if report.get("fake_groq"):
+        print(f"\nfake groq: {json.dumps(report['fake_groq'], sort_keys=True)}")
+
+
+def print_comparison(rows, regressions, tolerance):
+    print(f"\nagainst baseline (tolerance {tolerance:.0%})")
+    flagged = {row[0] for row in regressions}
+    for name, previous, current, change in rows:
+        mark = "REGRESSION" if name in flagged else ""
+        print(f"  {name:<36}{previous:>10.1f}{current:>10.1f}{change:>+9.0%}  {mark}")
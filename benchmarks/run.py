@@ -0,0 +1,375 @@
+"""
+End-to-end load benchmark.
+
+Starts Redis, Daphne, the io/cpu Celery workers and a fake Groq server
+(see benchmarks/fake_groq.py), then drives --users concurrent users through
+upload -> process (normalize, transcribe, summarize + flashcards, PDF)
+while each lecture is watched over its WebSocket. Reports p50/p95/p99 per
+stage, queue waits, WebSocket timings, throughput and worker utilization,
+and compares them with a baseline JSON.
+
+    python -m benchmarks.run --users 20
+    python -m benchmarks.run --users 20 --update-baseline
+    python -m benchmarks.run --users 20 --check          # exit 1 on regression
+
+Uses DB_* from the environment when set (use Postgres for real numbers);
+otherwise a throwaway SQLite database.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import time
+import uuid
+import wave
+from datetime import timedelta
+
+import requests
+
+from . import report as reporting
+from .stack import ROOT, Stack
+
+try:
+    from websockets.asyncio.client import connect as ws_connect
+except ImportError:  # pragma: no cover - optional
+    ws_connect = None
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+SAMPLE_RATE = 16000
+# A stage waits for these to finish before it can be queued
+PREDECESSORS = {
+    "normalize": [],
+    "transcribe": ["normalize"],
+    "summarize": ["transcribe"],
+    "flashcards": ["transcribe"],
+    "pdf": ["summarize", "flashcards"],
+}
+
+
+def make_wav(seconds, seed):
+    """
+    Noise as 16 kHz mono PCM. Every lecture gets different bytes so the
+    content-hash caches never short-circuit the pipeline.
+    """
+    rng = random.Random(seed)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(rng.randbytes(int(seconds * SAMPLE_RATE) * 2))
+    return buf.getvalue()
+
+
+def create_users(count, run_id):
+    """
+    Creates benchmark users directly in the database and returns their JWT,
+    which both the API and the WebSocket accept.
+    """
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    users = []
+    for i in range(count):
+        user = get_user_model().objects.create_user(
+            username=f"bench-{run_id}-{i}", email=f"bench-{run_id}-{i}@example.invalid", password=None,
+        )
+        token = AccessToken.for_user(user)
+        token.set_exp(lifetime=timedelta(hours=6))
+        users.append({"id": user.pk, "token": str(token)})
+    return users
+
+
+class Driver:
+    def __init__(self, args, base_url):
+        self.args = args
+        self.base_url = base_url
+        self.ws_url = base_url.replace("http://", "ws://", 1)
+        self.results = []
+
+    def http(self, user):
+        session = requests.Session()
+        session.headers["Authorization"] = f"Bearer {user['token']}"
+        return session
+
+    async def watch(self, user, lecture_id, record, connected, started):
+        """
+        Follows the lecture's WebSocket: connect time, time to the state
+        snapshot, and when "PDF ready" arrives relative to starting the workflow.
+        """
+        t0 = time.monotonic()
+        url = f"{self.ws_url}/ws/lecture/{lecture_id}/"
+        try:
+            async with ws_connect(url, subprotocols=["bearer", user["token"]], open_timeout=30) as ws:
+                record["ws_connect_ms"] = (time.monotonic() - t0) * 1000
+                connected.set()
+                async for raw in ws:
+                    message = json.loads(raw)
+                    record["ws_events"] = record.get("ws_events", 0) + 1
+                    if "ws_snapshot_ms" not in record:
+                        record["ws_snapshot_ms"] = (time.monotonic() - t0) * 1000
+                    data = message.get("data") or {}
+                    if started.get("t") and data.get("status") == "PDF ready":
+                        record["ws_pdf_ready_ms"] = (time.monotonic() - started["t"]) * 1000
+                        return
+        except Exception as e:
+            record["ws_error"] = str(e)
+        finally:
+            connected.set()
+
+    async def run_lecture(self, user, index):
+        args = self.args
+        session = self.http(user)
+        record = {"user": user["id"], "index": index}
+        self.results.append(record)
+        audio = make_wav(args.audio_seconds, f"{user['id']}-{index}-{uuid.uuid4()}")
+
+        t0 = time.monotonic()
+        response = await asyncio.to_thread(
+            session.post, f"{self.base_url}/api/lectures/",
+            data={"title": f"Benchmark lecture {user['id']}-{index}"},
+            files={"audio_file": (f"bench-{uuid.uuid4().hex}.wav", audio, "audio/wav")},
+            timeout=120,
+        )
+        record["upload_ms"] = (time.monotonic() - t0) * 1000
+        if response.status_code != 201:
+            record["error"] = f"upload: HTTP {response.status_code} {response.text[:200]}"
+            session.close()
+            return record
+        lecture_id = response.json()["id"]
+        record["lecture"] = lecture_id
+
+        watcher, started = None, {}
+        if ws_connect and not args.no_ws:
+            connected = asyncio.Event()
+            watcher = asyncio.create_task(self.watch(user, lecture_id, record, connected, started))
+            await asyncio.wait_for(connected.wait(), 35)
+        try:
+            await self.process(session, lecture_id, record, started)
+            if watcher:
+                # "PDF ready" can trail the workflow status by a flush interval
+                await asyncio.wait_for(asyncio.shield(watcher), 2)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if watcher:
+                watcher.cancel()
+            session.close()
+        return record
+
+    async def process(self, session, lecture_id, record, started):
+        args = self.args
+        started["t"] = t1 = time.monotonic()
+        response = await asyncio.to_thread(session.post, f"{self.base_url}/api/lectures/{lecture_id}/process/", timeout=60)
+        record["process_api_ms"] = (time.monotonic() - t1) * 1000
+        if response.status_code != 202:
+            record["error"] = f"process: HTTP {response.status_code} {response.text[:200]}"
+            return
+        workflow_id = response.json()["workflow_id"]
+        record["workflow"] = workflow_id
+
+        deadline = t1 + args.timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(args.poll_interval)
+            response = await asyncio.to_thread(session.get, f"{self.base_url}/api/workflows/{workflow_id}/", timeout=30)
+            if response.ok and response.json()["status"] != "running":
+                record["status"] = response.json()["status"]
+                break
+        else:
+            record["status"] = "timeout"
+        record["e2e_client_ms"] = (time.monotonic() - t1) * 1000
+        record["finished_at"] = time.monotonic()
+
+    async def run_user(self, user, start_delay):
+        await asyncio.sleep(start_delay)
+        for index in range(self.args.lectures_per_user):
+            await self.run_lecture(user, index)
+
+    async def run(self, users):
+        ramp = self.args.ramp_up / max(len(users), 1)
+        await asyncio.gather(*(self.run_user(user, i * ramp) for i, user in enumerate(users)))
+
+
+def stage_queues():
+    from django.conf import settings
+    from core.workflow import STAGE_TASKS
+
+    return {
+        stage: settings.CELERY_TASK_ROUTES.get(task, {}).get("queue", "celery")
+        for task, stage in STAGE_TASKS.items()
+    }
+
+
+def build_report(args, records, started, finished, fake_stats):
+    from core.models import LectureWorkflow
+
+    workflows = {
+        str(w.id): w for w in
+        LectureWorkflow.objects.filter(id__in=[r["workflow"] for r in records if r.get("workflow")])
+        .prefetch_related("stages")
+    }
+    stage_ms = {name: [] for name in PREDECESSORS}
+    wait_ms = {name: [] for name in PREDECESSORS}
+    busy_s = {}
+    queues = stage_queues()
+    e2e_server = []
+    errors = [r["error"] for r in records if r.get("error")]
+    for workflow in workflows.values():
+        stages = {s.name: s for s in workflow.stages.all()}
+        errors += [f"{name}: {s.error}" for name, s in stages.items() if s.status == "failed" and s.error]
+        if workflow.finished_at:
+            e2e_server.append((workflow.finished_at - workflow.created_at).total_seconds() * 1000)
+        for name, stage in stages.items():
+            if stage.duration_ms is None or name not in PREDECESSORS:
+                continue
+            stage_ms[name].append(stage.duration_ms)
+            queue = queues.get(name, "celery")
+            busy_s[queue] = busy_s.get(queue, 0.0) + stage.duration_ms / 1000
+            ready = [stages[p].finished_at for p in PREDECESSORS[name] if p in stages and stages[p].finished_at]
+            ready_at = max(ready) if ready else workflow.created_at
+            if stage.started_at:
+                wait_ms[name].append(max(0.0, (stage.started_at - ready_at).total_seconds() * 1000))
+
+    duration_s = max(finished - started, 1e-9)
+    completed = sum(1 for r in records if r.get("status") == "succeeded")
+    concurrency = {"io": args.io_concurrency, "cpu": args.cpu_concurrency, "celery": args.cpu_concurrency}
+    workers = {}
+    for queue, busy in sorted(busy_s.items()):
+        capacity = duration_s * concurrency.get(queue, 1)
+        workers[queue] = {
+            "concurrency": concurrency.get(queue, 1),
+            "busy_s": round(busy, 1),
+            "capacity_s": round(capacity, 1),
+            "utilization": round(busy / capacity, 3),
+        }
+
+    from django.db import connection
+
+    params = {name: getattr(args, name) for name in (
+        "users", "lectures_per_user", "audio_seconds", "latency_ms", "jitter_ms", "error_rate",
+        "rate_limit_rate", "tokens_per_second", "transcribe_rtf", "io_concurrency", "cpu_concurrency",
+    )}
+    params["database"] = connection.vendor
+    return {
+        "params": params,
+        "throughput": {
+            "completed": completed,
+            "failed": len(records) - completed,
+            "duration_s": round(duration_s, 1),
+            "per_minute": round(completed / duration_s * 60, 2),
+        },
+        "stages": {
+            "upload": reporting.summarize(r.get("upload_ms") for r in records),
+            "process_api": reporting.summarize(r.get("process_api_ms") for r in records),
+            **{name: reporting.summarize(values) for name, values in stage_ms.items()},
+            "e2e_server": reporting.summarize(e2e_server),
+            "e2e_client": reporting.summarize(r.get("e2e_client_ms") for r in records),
+        },
+        "queue_wait": {name: reporting.summarize(values) for name, values in wait_ms.items()},
+        "websocket": {
+            "connect": reporting.summarize(r.get("ws_connect_ms") for r in records),
+            "snapshot": reporting.summarize(r.get("ws_snapshot_ms") for r in records),
+            "pdf_ready": reporting.summarize(r.get("ws_pdf_ready_ms") for r in records),
+        },
+        "workers": workers,
+        "errors": errors[:20],
+        "fake_groq": fake_stats,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    load = parser.add_argument_group("load")
+    load.add_argument("--users", type=int, default=10)
+    load.add_argument("--lectures-per-user", type=int, default=1)
+    load.add_argument("--audio-seconds", type=float, default=30)
+    load.add_argument("--ramp-up", type=float, default=0, help="seconds over which users start")
+    load.add_argument("--timeout", type=float, default=600, help="per-workflow limit in seconds")
+    load.add_argument("--poll-interval", type=float, default=0.5)
+    load.add_argument("--no-ws", action="store_true", help="skip WebSocket subscriptions")
+    fake = parser.add_argument_group("fake Groq")
+    fake.add_argument("--latency-ms", type=float, default=200)
+    fake.add_argument("--jitter-ms", type=float, default=50)
+    fake.add_argument("--error-rate", type=float, default=0.0)
+    fake.add_argument("--rate-limit-rate", type=float, default=0.0)
+    fake.add_argument("--retry-after", type=float, default=1.0)
+    fake.add_argument("--tokens-per-second", type=float, default=200)
+    fake.add_argument("--transcribe-rtf", type=float, default=0.02)
+    stack = parser.add_argument_group("stack")
+    stack.add_argument("--io-concurrency", type=int, default=16)
+    stack.add_argument("--cpu-concurrency", type=int, default=2)
+    stack.add_argument("--redis-url", help="use this Redis instead of starting redis-server")
+    stack.add_argument("--redis-server", default="redis-server", help="redis-server binary")
+    stack.add_argument("--web-port", type=int, default=0)
+    stack.add_argument("--log-dir", help="service logs (default: a temp dir)")
+    stack.add_argument("--keep-files", action="store_true", help="keep uploaded media and PDFs")
+    out = parser.add_argument_group("output")
+    out.add_argument("--output", help="write the report JSON here")
+    out.add_argument("--baseline", default=DEFAULT_BASELINE)
+    out.add_argument("--update-baseline", action="store_true")
+    out.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    out.add_argument("--min-delta-ms", type=float, default=50,
+                     help="ignore latency changes smaller than this")
+    out.add_argument("--check", action="store_true", help="exit 1 if anything regressed")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if ws_connect is None and not args.no_ws:
+        print("websockets is not installed (pip install -r benchmarks/requirements.txt); "
+              "running without WebSocket subscriptions", file=sys.stderr)
+
+    stack = Stack(args)
+    try:
+        stack.start()
+        print(f"Stack up at {stack.base_url} (logs in {stack.log_dir})", flush=True)
+
+        import django
+        django.setup()
+
+        run_id = uuid.uuid4().hex[:8]
+        users = create_users(args.users, run_id)
+        driver = Driver(args, stack.base_url)
+        started = time.monotonic()
+        asyncio.run(driver.run(users))
+        finished = max([r["finished_at"] for r in driver.results if "finished_at" in r] or [time.monotonic()])
+        try:
+            fake_stats = requests.get(f"{stack.groq_url}/stats", timeout=5).json()
+        except requests.RequestException:
+            fake_stats = {}
+        report = build_report(args, driver.results, started, finished, fake_stats)
+    finally:
+        stack.stop()
+
+    reporting.print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    regressions = []
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatched = reporting.mismatched_params(report, baseline)
+        if mismatched:
+            print(f"\nBaseline was recorded with different {', '.join(mismatched)}; not comparing")
+        else:
+            rows, regressions = reporting.compare(report, baseline, args.tolerance, args.min_delta_ms)
+            reporting.print_comparison(rows, regressions, args.tolerance)
+
+    if args.check and (regressions or report["throughput"]["failed"]):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
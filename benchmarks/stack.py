@@ -0,0 +1,157 @@
+"""
+Starts the services a benchmark run needs as child processes: Redis, the
+fake Groq server, Daphne and the io/cpu Celery workers (mirroring
+docker-compose.yml), all pointed at each other through the environment.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30.0, proc=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"{' '.join(proc.args[:3])} exited with {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout:.0f}s")
+
+
+class Stack:
+    def __init__(self, args):
+        self.args = args
+        self.procs = []
+        self.work_dir = tempfile.mkdtemp(prefix="studyapp-bench-")
+        self.log_dir = args.log_dir or os.path.join(self.work_dir, "logs")
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.redis_url = args.redis_url
+        self.fake_port = free_port()
+        self.web_port = args.web_port or free_port()
+        self.env = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.web_port}"
+
+    @property
+    def groq_url(self):
+        return f"http://127.0.0.1:{self.fake_port}"
+
+    def build_env(self):
+        env = dict(os.environ)
+        env.update({
+            "DJANGO_SETTINGS_MODULE": "study_app.settings",
+            "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")])),
+            "REDIS_URL": self.redis_url,
+            "CELERY_RESULT_BACKEND": env.get("CELERY_RESULT_BACKEND", "django-db"),
+            "GROQ_API_BASE": f"{self.groq_url}/openai/v1",
+            "GROQ_API_KEY": "benchmark",
+            "ALLOWED_HOSTS": "127.0.0.1,localhost",
+            "MEDIA_ROOT": os.path.join(self.work_dir, "media"),
+            "MEDIA_BACKEND": "local",
+            "DEBUG": "False",
+            # All processes share one metrics directory, so Daphne's /metrics covers the workers too
+            "PROMETHEUS_MULTIPROC_DIR": os.path.join(self.work_dir, "prometheus"),
+            "METRICS_WORKER_PORT": "0",
+        })
+        os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+        if not env.get("DB_ENGINE") and not env.get("DB_NAME"):
+            env["DB_NAME"] = os.path.join(self.work_dir, "bench.sqlite3")
+        if "sqlite" in env.get("DB_ENGINE", "sqlite"):
+            print("Using SQLite: concurrent workers will hit 'database is locked'; "
+                  "set DB_ENGINE and DB_* to benchmark against Postgres", file=sys.stderr)
+        return env
+
+    def spawn(self, name, cmd):
+        log = open(os.path.join(self.log_dir, f"{name}.log"), "wb")
+        proc = subprocess.Popen(cmd, cwd=ROOT, env=self.env, stdout=log, stderr=subprocess.STDOUT)
+        self.procs.append((name, proc, log))
+        return proc
+
+    def start(self):
+        args = self.args
+        if not self.redis_url:
+            redis_server = shutil.which(args.redis_server) or args.redis_server
+            port = free_port()
+            proc = self.spawn("redis", [
+                redis_server, "--port", str(port), "--save", "", "--appendonly", "no", "--dir", self.work_dir,
+            ])
+            wait_for_port(port, proc=proc)
+            self.redis_url = f"redis://127.0.0.1:{port}/0"
+        self.env = self.build_env()
+        os.environ.update(self.env)
+
+        self.run_once("migrate", [sys.executable, "manage.py", "migrate", "--noinput", "-v", "0"])
+
+        proc = self.spawn("fake_groq", [
+            sys.executable, "-m", "benchmarks.fake_groq", "--port", str(self.fake_port),
+            "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+            "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+            "--retry-after", str(args.retry_after), "--tokens-per-second", str(args.tokens_per_second),
+            "--transcribe-rtf", str(args.transcribe_rtf),
+        ])
+        wait_for_port(self.fake_port, proc=proc)
+
+        proc = self.spawn("daphne", [
+            sys.executable, "-m", "daphne", "-b", "127.0.0.1", "-p", str(self.web_port),
+            "study_app.asgi:application",
+        ])
+        wait_for_port(self.web_port, proc=proc)
+
+        self.spawn("celery_io", [
+            sys.executable, "-m", "celery", "-A", "study_app", "worker", "-l", "warning", "-Q", "io",
+            "--pool=threads", f"--concurrency={args.io_concurrency}", "-n", f"io-bench-{self.web_port}@%h",
+        ])
+        self.spawn("celery_cpu", [
+            sys.executable, "-m", "celery", "-A", "study_app", "worker", "-l", "warning", "-Q", "cpu,celery",
+            "--pool=prefork", f"--concurrency={args.cpu_concurrency}", "-n", f"cpu-bench-{self.web_port}@%h",
+        ])
+        self.wait_for_workers(2)
+
+    def run_once(self, name, cmd):
+        with open(os.path.join(self.log_dir, f"{name}.log"), "wb") as log:
+            subprocess.run(cmd, cwd=ROOT, env=self.env, stdout=log, stderr=subprocess.STDOUT, check=True)
+
+    def wait_for_workers(self, count, timeout=60.0):
+        from study_app.celery import app
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for name, proc, _ in self.procs:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"{name} exited with {proc.returncode}; see {self.log_dir}")
+            replies = app.control.ping(timeout=1.0) or []
+            names = {name for reply in replies for name in reply}
+            if len([n for n in names if f"-bench-{self.web_port}@" in n]) >= count:
+                return
+        raise RuntimeError(f"Celery workers did not answer within {timeout:.0f}s; see {self.log_dir}")
+
+    def stop(self):
+        for name, proc, log in reversed(self.procs):
+            if proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+            log.close()
+        self.procs = []
+        if not self.args.keep_files:
+            shutil.rmtree(os.path.join(self.work_dir, "media"), ignore_errors=True)
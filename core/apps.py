@@ -5,3 +5,7 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     path = os.path.join(os.path.dirname(os.path.abspath(__file__)))
+
+    def ready(self):
+        from . import search  # noqa: F401  registers the index cleanup on delete
+        from . import metrics  # noqa: F401  connects the Celery timing signals
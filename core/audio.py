@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import subprocess
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# A slice of the source recording; start/end are offsets in seconds.
+AudioChunk = namedtuple("AudioChunk", ["index", "path", "start", "end"])
+
+
+def probe_duration(path):
+    """
+    Returns the duration of an audio file in seconds using ffprobe.
+    """
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "json",
+            path,
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return float(json.loads(result.stdout)["format"]["duration"])
+
+
+def split_audio(path, out_dir, chunk_seconds, overlap_seconds):
+    """
+    Splits an audio file into overlapping time windows written to out_dir.
+    Recordings shorter than one window are returned as a single chunk without
+    being copied.
+    """
+    if overlap_seconds >= chunk_seconds:
+        raise ValueError("Chunk overlap must be shorter than the chunk length.")
+
+    try:
+        duration = probe_duration(path)
+    except FileNotFoundError:
+        logger.warning("ffprobe is not installed; transcribing the file as a single chunk.")
+        return [AudioChunk(0, path, 0.0, None)]
+
+    if duration <= chunk_seconds:
+        return [AudioChunk(0, path, 0.0, duration)]
+
+    ext = os.path.splitext(path)[1].lower()
+    step = chunk_seconds - overlap_seconds
+    chunks = []
+    start = 0.0
+    while start < duration:
+        end = min(start + chunk_seconds, duration)
+        chunk_path = os.path.join(out_dir, f"chunk_{len(chunks):04d}{ext}")
+        subprocess.run(
+            [
+                "ffmpeg", "-v", "error", "-y",
+                "-ss", f"{start:.3f}",
+                "-t", f"{end - start:.3f}",
+                "-i", path,
+                "-c", "copy",
+                chunk_path,
+            ],
+            capture_output=True,
+            check=True,
+        )
+        chunks.append(AudioChunk(len(chunks), chunk_path, start, end))
+        if end >= duration:
+            break
+        start += step
+
+    logger.info(f"Split {path} ({duration:.0f}s) into {len(chunks)} chunks")
+    return chunks
+
+
+def normalize_audio(src_path, dst_path, sample_rate=16000, bitrate="24k"):
+    """
+    Downmixes to mono, resamples and re-encodes to Opus, which is all the
+    speech model needs and a fraction of the size of the uploaded file.
+    """
+    subprocess.run(
+        [
+            "ffmpeg", "-v", "error", "-y",
+            "-i", src_path,
+            "-vn",
+            "-ac", "1",
+            "-ar", str(sample_rate),
+            "-c:a", "libopus",
+            "-b:a", bitrate,
+            "-application", "voip",
+            dst_path,
+        ],
+        capture_output=True,
+        check=True,
+    )
+    return dst_path
@@ -0,0 +1,79 @@
+import hashlib
+import logging
+
+from redis.exceptions import RedisError
+
+from .models import CachedResult
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "result_cache:stats"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(fileobj):
+    """
+    Hashes a Django File (or any object with chunks()) without reading it
+    into memory at once.
+    """
+    digest = hashlib.sha256()
+    for chunk in fileobj.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def text_sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_key(kind, *parts):
+    return text_sha256("\x1f".join([kind, *[str(p) for p in parts]]))
+
+
+def _count(kind, outcome):
+    try:
+        get_redis().hincrby(STATS_KEY, f"{kind}:{outcome}", 1)
+    except RedisError as e:
+        logger.debug(f"Could not update cache stats: {e}")
+
+
+def get(kind, *parts):
+    """
+    Returns the cached value for (kind, *parts) or None, counting the hit or miss.
+    """
+    value = (
+        CachedResult.objects.filter(key=make_key(kind, *parts))
+        .values_list("value", flat=True)
+        .first()
+    )
+    _count(kind, "hits" if value is not None else "misses")
+    return value
+
+
+def contains(kind, *parts):
+    return CachedResult.objects.filter(key=make_key(kind, *parts)).exists()
+
+
+def put(kind, value, *parts):
+    CachedResult.objects.update_or_create(
+        key=make_key(kind, *parts), defaults={"kind": kind, "value": value}
+    )
+
+
+def stats():
+    """
+    Returns {kind: {"hits": n, "misses": n}} from the shared counters.
+    """
+    try:
+        raw = get_redis().hgetall(STATS_KEY)
+    except RedisError as e:
+        logger.warning(f"Could not read cache stats: {e}")
+        return {}
+    result = {}
+    for field, count in raw.items():
+        kind, outcome = field.rsplit(":", 1)
+        result.setdefault(kind, {"hits": 0, "misses": 0})[outcome] = int(count)
+    return result
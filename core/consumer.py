@@ -1,10 +1,108 @@
+import asyncio
 import json
 import logging
+import time
+from collections import Counter, deque
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.utils import timezone
+from . import events
+from .middleware import TOKEN_SUBPROTOCOL
+from .models import ArtifactKind, AudioLecture
+from .storage import media_url
 
 logger = logging.getLogger(__name__)
 
+
+@database_sync_to_async
+def owns_lecture(user, lecture_id):
+    if not user or not user.is_authenticated:
+        return False
+    return AudioLecture.objects.filter(id=lecture_id, user=user).exists()
+
+
+@database_sync_to_async
+def load_snapshot(lecture_id):
+    """
+    Current state of a lecture, without the large texts.
+    """
+    lecture = AudioLecture.objects.filter(id=lecture_id).first()
+    if not lecture:
+        return None
+    kinds = set(lecture.artifacts.values_list('kind', flat=True).distinct())
+    workflow = lecture.workflows.order_by('-created_at').prefetch_related('stages').first()
+    return {
+        "lecture_id": lecture.id,
+        "title": lecture.title,
+        "status": lecture.get_status_display(),
+        "has_transcript": ArtifactKind.TRANSCRIPT in kinds,
+        "has_summary": ArtifactKind.SUMMARY in kinds,
+        "has_flashcards": ArtifactKind.FLASHCARDS in kinds,
+        "pdf_file": media_url(lecture.pdf_file),
+        "workflow": {
+            "id": str(workflow.id),
+            "status": workflow.status,
+            "stages": {stage.name: stage.status for stage in workflow.stages.all()},
+        } if workflow else None,
+    }
+
+
+class TokenBucket:
+    """
+    Allows `rate` messages a second on average with bursts up to `burst`.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class Outbox:
+    """
+    Bounded queue of events waiting to be written to one client. A newer
+    status_update replaces one still queued, and when full the oldest
+    streamed delta (or else the oldest event) is dropped. Clients notice
+    the gap in seq and can reconnect with ?last_seq= to replay it.
+    """
+    def __init__(self, size, drops):
+        self.items = deque()
+        self.size = size
+        self.drops = drops
+        self.ready = asyncio.Event()
+
+    def put(self, event):
+        if event.get("event") == "status_update":
+            stale = next((e for e in self.items if e.get("event") == "status_update"), None)
+            if stale is not None:
+                self.items.remove(stale)
+                self.drops["coalesced"] += 1
+        if len(self.items) >= self.size:
+            victim = next((e for e in self.items if e.get("event", "").endswith("_delta")), self.items[0])
+            self.items.remove(victim)
+            self.drops["dropped"] += 1
+        self.items.append(event)
+        self.ready.set()
+
+    async def get(self):
+        while not self.items:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.items.popleft()
+
+
 class LectureConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         try:
@@ -15,22 +113,69 @@ class LectureConsumer(AsyncWebsocketConsumer):
                 return
 
             self.group_name = f"lecture_{self.lecture_id}"
+            self.drops = Counter()
+            self.writer = None
 
-            # Add user info for potential auditing
             user = self.scope.get("user")
-            logger.info(f"User {user if user.is_authenticated else 'Anonymous'} connected to {self.group_name} at {timezone.now()}.")
+            if not await owns_lecture(user, self.lecture_id):
+                logger.warning(f"Connection rejected: {user} does not own {self.group_name}.")
+                await self.close(code=4003)
+                return
 
+            # Add user info for potential auditing
+            logger.info(f"User {user} connected to {self.group_name} at {timezone.now()}.")
+
+            self.limiter = TokenBucket(settings.WS_RATE_LIMIT, settings.WS_RATE_BURST)
+            self.outbox = Outbox(settings.WS_OUTBOX_SIZE, self.drops)
             await self.channel_layer.group_add(self.group_name, self.channel_name)
-            await self.accept()
+            # A client that sent its token as a subprotocol expects it echoed
+            offered = self.scope.get("subprotocols") or []
+            await self.accept(TOKEN_SUBPROTOCOL if TOKEN_SUBPROTOCOL in offered else None)
+            # Group events wait until connect returns, so the initial state
+            # is written before anything queued in the outbox.
+            await self.send_initial_state()
+            self.writer = asyncio.ensure_future(self.drain_outbox())
 
         except Exception as e:
             logger.error(f"WebSocket connection failed: {str(e)}", exc_info=True)
             await self.close(code=4000)
 
+    async def send_initial_state(self):
+        """
+        Replays the events after ?last_seq= when the log still covers them,
+        otherwise sends a snapshot. Live events with a seq at or below the
+        snapshot's can be ignored by the client; the snapshot includes them.
+        """
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        last_seq = query.get("last_seq", [None])[0]
+        if last_seq is not None and last_seq.isdigit():
+            missed = await sync_to_async(events.since)(self.group_name, int(last_seq))
+            if missed is not None:
+                for event in missed:
+                    await self.write_event(event)
+                return
+
+        # Read the sequence before the state so nothing falls between them
+        seq = await sync_to_async(events.current_seq)(self.group_name)
+        snapshot = await load_snapshot(self.lecture_id)
+        if snapshot is not None:
+            await self.write_event({"event": "snapshot", "data": snapshot, "seq": seq})
+
+    async def drain_outbox(self):
+        while True:
+            event = await self.outbox.get()
+            await self.write_event(event)
+
     async def disconnect(self, close_code):
         try:
+            if getattr(self, "writer", None):
+                self.writer.cancel()
+            if not hasattr(self, "group_name"):
+                return
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
-            logger.info(f"Disconnected from {self.group_name} with code {close_code}.")
+            if self.drops:
+                await sync_to_async(events.record_drops)(self.drops)
+            logger.info(f"Disconnected from {self.group_name} with code {close_code}; drops {dict(self.drops)}.")
         except Exception as e:
             logger.error(f"Error during disconnect: {str(e)}", exc_info=True)
 
@@ -39,9 +184,23 @@ class LectureConsumer(AsyncWebsocketConsumer):
         Handles incoming WebSocket messages.
         """
         try:
+            if bytes_data is not None:
+                await self.send_error("Binary frames are not supported.")
+                return
             if not text_data:
                 return
 
+            if len(text_data.encode()) > settings.WS_MAX_FRAME_BYTES:
+                self.drops["oversized"] += 1
+                await self.send_error("Message too large.")
+                await self.close(code=1009)
+                return
+
+            if not self.limiter.take():
+                self.drops["rate_limited"] += 1
+                await self.send_error("Too many messages; slow down.")
+                return
+
             data = json.loads(text_data)
             event = data.get("event")
             payload = data.get("data")
@@ -64,12 +223,16 @@ class LectureConsumer(AsyncWebsocketConsumer):
 
     async def send_event(self, event):
         """
-        Sends events to the client — called when a group message is received.
+        Queues events for the client — called when a group message is received.
         """
+        self.outbox.put(event)
+
+    async def write_event(self, event):
         try:
             await self.send(text_data=json.dumps({
                 "event": event.get("event"),
                 "data": event.get("data"),
+                "seq": event.get("seq"),
             }))
         except Exception as e:
             logger.error(f"Error sending event: {str(e)}", exc_info=True)
@@ -0,0 +1,146 @@
+import json
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Streamed text is superseded by the final "ready" event and the snapshot,
+# so it is sent live only and never takes space in the replay log.
+UNLOGGED_EVENTS = {"summary_delta", "flashcards_delta"}
+
+# Numbers the event and appends it to the group's capped log in one step,
+# so concurrent workers can't store events out of sequence order. ARGV[1]
+# and ARGV[2] arrive JSON-encoded and are spliced in as they are.
+APPEND_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('RPUSH', KEYS[2], '{"seq": ' .. seq .. ', "event": ' .. ARGV[1] .. ', "data": ' .. ARGV[2] .. '}')
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[3]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return seq
+"""
+
+# Per-reason counts of WebSocket messages dropped, coalesced or refused.
+DROPS_KEY = "ws:drops"
+# Per-task-name totals of worker notifications queued, coalesced and sent.
+TASK_COUNTS_KEY = "ws:task_notifications"
+
+_script = None
+
+
+def _keys(group_name):
+    return f"events:{group_name}:seq", f"events:{group_name}:log"
+
+
+def record(group_name, event_type, data):
+    """
+    Appends an event to the group's replay log and returns its sequence
+    number, or None for unlogged events or when Redis is unavailable.
+    """
+    return record_many(group_name, [(event_type, data)])[0]
+
+
+def record_many(group_name, items):
+    """
+    Logs a batch of (event_type, data) in one pipelined round trip and
+    returns their sequence numbers in order.
+    """
+    global _script
+    if _script is None:
+        _script = get_redis().register_script(APPEND_SCRIPT)
+    logged = [i for i, (event_type, _) in enumerate(items) if event_type not in UNLOGGED_EVENTS]
+    seqs = [None] * len(items)
+    if not logged:
+        return seqs
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for i in logged:
+            event_type, data = items[i]
+            _script(
+                keys=list(_keys(group_name)),
+                args=[json.dumps(event_type), json.dumps(data), settings.EVENT_LOG_SIZE, settings.EVENT_LOG_TTL],
+                client=pipe,
+            )
+        for i, seq in zip(logged, pipe.execute()):
+            seqs[i] = seq
+    except RedisError as e:
+        logger.warning(f"Could not record events for {group_name}: {e}")
+    return seqs
+
+
+def current_seq(group_name):
+    try:
+        return int(get_redis().get(_keys(group_name)[0]) or 0)
+    except RedisError as e:
+        logger.warning(f"Could not read event sequence for {group_name}: {e}")
+        return None
+
+
+def since(group_name, last_seq):
+    """
+    Returns the logged events after last_seq, oldest first, or None when the
+    log no longer reaches back that far and the client needs a snapshot.
+    """
+    try:
+        raw = get_redis().lrange(_keys(group_name)[1], 0, -1)
+    except RedisError as e:
+        logger.warning(f"Could not read event log for {group_name}: {e}")
+        return None
+    events = [json.loads(item) for item in raw]
+    if not events:
+        return [] if last_seq >= (current_seq(group_name) or 0) else None
+    if events[0]["seq"] > last_seq + 1:
+        return None
+    return [event for event in events if event["seq"] > last_seq]
+
+
+def record_drops(counts):
+    try:
+        pipe = get_redis().pipeline()
+        for reason, n in counts.items():
+            pipe.hincrby(DROPS_KEY, reason, n)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Could not record WebSocket drop counts: {e}")
+
+
+def drop_stats():
+    """
+    Returns {reason: count} summed over all closed connections.
+    """
+    try:
+        return {reason: int(n) for reason, n in get_redis().hgetall(DROPS_KEY).items()}
+    except RedisError as e:
+        logger.warning(f"Could not read WebSocket drop counts: {e}")
+        return {}
+
+
+def record_task_counts(task_name, counts):
+    try:
+        pipe = get_redis().pipeline()
+        for name, n in counts.items():
+            pipe.hincrby(TASK_COUNTS_KEY, f"{task_name}:{name}", n)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Could not record notification counts for {task_name}: {e}")
+
+
+def task_count_stats():
+    """
+    Returns {task_name: {"queued": n, "coalesced": n, "sent": n}}.
+    """
+    try:
+        raw = get_redis().hgetall(TASK_COUNTS_KEY)
+    except RedisError as e:
+        logger.warning(f"Could not read notification counts: {e}")
+        return {}
+    stats = defaultdict(dict)
+    for field, n in raw.items():
+        task_name, name = field.rsplit(":", 1)
+        stats[task_name][name] = int(n)
+    return dict(stats)
@@ -0,0 +1,118 @@
+import json
+import re
+from datetime import timedelta
+
+FLASHCARDS_PROMPT = (
+    "Generate 10 flashcards from this lecture. Reply with JSON only, in the form "
+    '{{"flashcards": [{{"question": "...", "answer": "...", "source": "..."}}]}}, '
+    "where source is the sentence of the lecture the card is based on, copied exactly."
+    "\n\n{text}"
+)
+MAX_CARDS = 50
+MAX_QUESTION_CHARS = 1000
+MAX_ANSWER_CHARS = 4000
+MAX_SOURCE_CHARS = 1000
+
+# SM-2: grades run 0-5, anything below 3 is a lapse that restarts the card
+MIN_GRADE, MAX_GRADE = 0, 5
+PASSING_GRADE = 3
+MIN_EASE = 1.3
+SCHEDULE_FIELDS = ["ease_factor", "interval_days", "repetitions", "lapses", "due_at", "last_reviewed_at"]
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_WORD = re.compile(r"[\w']+")
+
+
+class FlashcardFormatError(ValueError):
+    pass
+
+
+def parse_flashcards(text):
+    """
+    Validates the model's JSON reply and returns (question, answer, source)
+    tuples; source is "" when the model left it out. Tolerates a Markdown
+    code fence and a bare list instead of an object.
+    """
+    try:
+        data = json.loads(_FENCE.sub("", text.strip()))
+    except ValueError as e:
+        raise FlashcardFormatError(f"Flashcards are not valid JSON: {e}")
+    if isinstance(data, dict):
+        data = data.get("flashcards")
+    if not isinstance(data, list) or not data:
+        raise FlashcardFormatError("Expected a non-empty list of flashcards")
+
+    cards = []
+    for item in data[:MAX_CARDS]:
+        if not isinstance(item, dict):
+            raise FlashcardFormatError("Each flashcard must be an object")
+        question = str(item.get("question") or "").strip()
+        answer = str(item.get("answer") or "").strip()
+        if not question or not answer:
+            raise FlashcardFormatError("Each flashcard needs a question and an answer")
+        source = str(item.get("source") or "").strip()
+        cards.append((question[:MAX_QUESTION_CHARS], answer[:MAX_ANSWER_CHARS], source[:MAX_SOURCE_CHARS]))
+    return cards
+
+
+def as_text(cards):
+    """
+    Plain-text rendering kept as the FLASHCARDS artifact (PDF export, search).
+    """
+    return "\n\n".join(f"Q: {card[0]}\nA: {card[1]}" for card in cards)
+
+
+def _words(text):
+    return set(_WORD.findall(text.lower()))
+
+
+def locate(source, segments):
+    """
+    Start offset of the transcript segment the quoted source comes from.
+    segments are (start_ms, text) in order. A quote may straddle two
+    segments, so neighbouring pairs are tried when no single segment holds
+    most of its words. Returns None when nothing matches well enough (a
+    card written from the summary quotes text the transcript lacks).
+    """
+    wanted = _words(source)
+    if not wanted:
+        return None
+    segments = [(start_ms, _words(text)) for start_ms, text in segments]
+    windows = [
+        segments,
+        [(a[0], a[1] | b[1]) for a, b in zip(segments, segments[1:])],
+    ]
+    for window in windows:
+        best, best_score = None, 0
+        for start_ms, words in window:
+            score = len(wanted & words)
+            if score > best_score:
+                best, best_score = start_ms, score
+        if best_score * 2 > len(wanted):
+            return best
+    return None
+
+
+def review(card, grade, now):
+    """
+    Applies one SM-2 review to the card in place; the caller saves
+    SCHEDULE_FIELDS.
+    """
+    if grade >= PASSING_GRADE:
+        if card.repetitions == 0:
+            card.interval_days = 1
+        elif card.repetitions == 1:
+            card.interval_days = 6
+        else:
+            card.interval_days = round(card.interval_days * card.ease_factor)
+        card.repetitions += 1
+    else:
+        card.repetitions = 0
+        card.interval_days = 1
+        card.lapses += 1
+    card.ease_factor = max(
+        MIN_EASE, card.ease_factor + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02)
+    )
+    card.due_at = now + timedelta(days=card.interval_days)
+    card.last_reviewed_at = now
+    return card
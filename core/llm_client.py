@@ -0,0 +1,201 @@
+import email.utils
+import json
+import logging
+import os
+import random
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import metrics, ratelimit
+from .tokens import estimate_message_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Completion size assumed when reserving tokens-per-minute for a chat call.
+DEFAULT_COMPLETION_TOKENS = 1024
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header given either as seconds or as an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed is None:
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+class GroqClient:
+    """
+    Keep-alive client for the OpenAI-compatible Groq API. Every call first
+    takes capacity from the shared rate limiter. Retries 429/5xx responses
+    and connection errors with jittered exponential backoff, honouring
+    Retry-After when the server sends one. A 429 asking to wait longer than
+    max_retry_after raises RateLimited instead, so the task is rescheduled
+    rather than holding a worker thread (daily quotas can ask for hours).
+    """
+
+    def __init__(self, base_url, api_key, connect_timeout=5, read_timeout=60,
+                 max_retries=4, backoff_base=1.0, backoff_cap=30.0, pool_size=10,
+                 max_retry_after=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retry_after = max_retry_after
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def post(self, path, timeout=None, **kwargs):
+        """
+        POSTs to base_url + path. Returns the final response; raises the last
+        network error if every attempt failed to connect.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        endpoint = path.strip("/")
+        model = (kwargs.get("json") or kwargs.get("data") or {}).get("model", "unknown")
+        if timeout is None:
+            timeout = self.timeout
+        elif not isinstance(timeout, tuple):
+            timeout = (self.timeout[0], timeout)
+
+        for attempt in range(self.max_retries + 1):
+            for f in (kwargs.get("files") or {}).values():
+                fileobj = f[1] if isinstance(f, tuple) else f
+                fileobj.seek(0)
+
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.UPSTREAM_SECONDS.labels(endpoint, model, "error").observe(time.perf_counter() - start)
+                if attempt == self.max_retries:
+                    raise
+                metrics.UPSTREAM_RETRIES.labels(endpoint, type(e).__name__).inc()
+                delay = self._backoff(attempt)
+                logger.warning(f"POST {path} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            metrics.UPSTREAM_SECONDS.labels(endpoint, model, response.status_code).observe(
+                time.perf_counter() - start)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None and retry_after > self.max_retry_after:
+                if response.status_code != 429:
+                    return response
+                response.close()
+                logger.warning(f"POST {path} returned 429 with Retry-After {retry_after:.0f}s; giving up the slot")
+                raise ratelimit.RateLimited(model, retry_after)
+
+            metrics.UPSTREAM_RETRIES.labels(endpoint, response.status_code).inc()
+            delay = self._backoff(attempt, retry_after)
+            logger.warning(f"POST {path} returned {response.status_code}; retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+
+    def chat(self, messages, model, stream=False, **options):
+        """
+        With stream=True the body is left unread; pass a 200 response to
+        iter_deltas to consume the completion as it is generated.
+        """
+        tokens = estimate_message_tokens(messages) + options.get("max_tokens", DEFAULT_COMPLETION_TOKENS)
+        ratelimit.acquire(model, tokens)
+        payload = {"model": model, "messages": messages, **options}
+        if stream:
+            payload["stream"] = True
+        return self.post("chat/completions", json=payload, stream=stream)
+
+    def transcribe(self, path, model, timeout=None, **options):
+        ratelimit.acquire(model)
+        metrics.UPSTREAM_AUDIO_BYTES.labels(model).inc(os.path.getsize(path))
+        with open(path, "rb") as f:
+            return self.post(
+                "audio/transcriptions",
+                files={"file": (os.path.basename(path), f)},
+                data={"model": model, **options},
+                timeout=timeout,
+            )
+
+
+def error_message(response):
+    """
+    The API's error message from a failed response, if it sent one.
+    """
+    try:
+        return response.json().get("error", {}).get("message", "Sorry, data not available")
+    except ValueError:
+        return "Sorry, data not available"
+
+
+def iter_deltas(response):
+    """
+    Yields the content fragments of a streamed (server-sent events) chat
+    completion until the terminating [DONE] message.
+    """
+    # text/event-stream has no default charset; without one requests yields bytes
+    response.encoding = response.encoding or "utf-8"
+    with response:
+        # chunk_size=None hands lines over as they arrive instead of in 512-byte reads
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            chunk = json.loads(data)
+            metrics.record_usage(chunk)
+            choices = chunk.get("choices") or [{}]
+            content = choices[0].get("delta", {}).get("content")
+            if content:
+                yield content
+
+
+_client = None
+_client_pid = None
+
+
+def get_client():
+    """
+    Returns the client for this worker process. Prefork children each build
+    their own so pooled sockets are never shared across a fork.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = GroqClient(
+            settings.GROQ_API_BASE,
+            settings.GROQ_API_KEY,
+            connect_timeout=settings.GROQ_CONNECT_TIMEOUT,
+            read_timeout=settings.GROQ_READ_TIMEOUT,
+            max_retries=settings.GROQ_MAX_RETRIES,
+            pool_size=settings.GROQ_POOL_SIZE,
+            max_retry_after=settings.GROQ_MAX_RETRY_AFTER,
+        )
+        _client_pid = os.getpid()
+    return _client
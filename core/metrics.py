@@ -0,0 +1,170 @@
+"""
+Prometheus metrics. When PROMETHEUS_MULTIPROC_DIR is set (as in the Docker
+image) every process writes its samples to files there and a scrape of any
+process aggregates all of them, so Daphne, Celery prefork children and the
+management commands all report into the same series.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from celery.signals import (
+    before_task_publish, task_postrun, task_prerun, task_retry,
+    worker_process_shutdown, worker_ready,
+)
+from django.conf import settings
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess, start_http_server,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers both a fast HTTP request and a long transcription
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Header stamped on every published task so the worker can tell how long it queued
+PUBLISHED_AT_HEADER = "published_at"
+
+TASK_QUEUE_SECONDS = Histogram(
+    "studyapp_task_queue_seconds", "Time from publish (or ETA) until a worker starts the task",
+    ["task", "queue"], buckets=LATENCY_BUCKETS,
+)
+TASK_RUN_SECONDS = Histogram(
+    "studyapp_task_run_seconds", "Celery task execution time", ["task", "state"], buckets=LATENCY_BUCKETS,
+)
+TASK_RETRIES = Counter("studyapp_task_retries", "Celery task retries", ["task"])
+
+UPSTREAM_SECONDS = Histogram(
+    "studyapp_upstream_request_seconds", "Groq API request time per attempt, until response headers",
+    ["endpoint", "model", "status"], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_RETRIES = Counter("studyapp_upstream_retries", "Retried Groq API attempts", ["endpoint", "reason"])
+UPSTREAM_AUDIO_BYTES = Counter("studyapp_upstream_audio_bytes", "Audio bytes sent for transcription", ["model"])
+LLM_TOKENS = Counter("studyapp_llm_tokens", "Tokens reported by the API", ["model", "direction"])
+PROMPT_TOKENS = Histogram(
+    "studyapp_prompt_tokens", "Prompt size counted locally before sending", ["purpose"],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+PROMPTS_TRUNCATED = Counter("studyapp_prompts_truncated", "Prompts cut to fit their token budget", ["purpose"])
+
+UPLOAD_BYTES = Counter("studyapp_upload_bytes", "Lecture audio bytes received", ["method"])
+DB_WRITE_SECONDS = Histogram(
+    "studyapp_db_write_seconds", "Time spent in bulk database writes", ["operation"], buckets=LATENCY_BUCKETS,
+)
+PDF_RENDER_SECONDS = Histogram("studyapp_pdf_render_seconds", "PDF render time", buckets=LATENCY_BUCKETS)
+PDF_EXPORTS = Counter("studyapp_pdf_exports", "PDF exports", ["result"])
+WS_FLUSH_SECONDS = Histogram(
+    "studyapp_ws_flush_seconds", "Time to log and send one batch of worker WebSocket events",
+    buckets=LATENCY_BUCKETS,
+)
+WS_MESSAGES = Counter("studyapp_ws_messages", "Worker WebSocket events", ["outcome"])
+
+HTTP_SECONDS = Histogram(
+    "studyapp_http_request_seconds", "HTTP request time by view",
+    ["method", "view", "status"], buckets=LATENCY_BUCKETS,
+)
+
+
+@contextmanager
+def timed(histogram, **labels):
+    """
+    Observes the time spent in the block, also when it raises.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(**labels) if labels else histogram).observe(time.perf_counter() - start)
+
+
+def record_usage(data):
+    """
+    Counts the tokens of a chat completion response or a final stream chunk.
+    Groq reports streamed usage under x_groq.
+    """
+    usage = data.get("usage") or (data.get("x_groq") or {}).get("usage")
+    if not usage:
+        return
+    model = data.get("model") or "unknown"
+    LLM_TOKENS.labels(model, "in").inc(usage.get("prompt_tokens") or 0)
+    LLM_TOKENS.labels(model, "out").inc(usage.get("completion_tokens") or 0)
+
+
+def multiprocess_mode():
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def registry():
+    if not multiprocess_mode():
+        return REGISTRY
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+
+
+def exposition():
+    """
+    Returns (body, content type) for a scrape.
+    """
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
+
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **extra):
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+_started = {}
+
+
+@task_prerun.connect
+def task_started(task_id=None, task=None, **extra):
+    _started[task_id] = time.perf_counter()
+    request = task.request
+    published = request.get(PUBLISHED_AT_HEADER)
+    if not published or request.is_eager:
+        return
+    ready = published
+    if request.eta:
+        eta = datetime.fromisoformat(request.eta) if isinstance(request.eta, str) else request.eta
+        ready = max(ready, eta.timestamp())
+    queue = (request.delivery_info or {}).get("routing_key") or "unknown"
+    TASK_QUEUE_SECONDS.labels(task.name, queue).observe(max(0.0, time.time() - ready))
+
+
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **extra):
+    start = _started.pop(task_id, None)
+    if start is not None:
+        TASK_RUN_SECONDS.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - start)
+
+
+@task_retry.connect
+def task_retried(sender=None, **extra):
+    TASK_RETRIES.labels(sender.name if sender else "unknown").inc()
+
+
+@worker_ready.connect
+def serve_worker_metrics(**extra):
+    """
+    Workers have no HTTP server of their own; expose their metrics on
+    METRICS_WORKER_PORT (0 disables it).
+    """
+    port = settings.METRICS_WORKER_PORT
+    if not port:
+        return
+    try:
+        start_http_server(port, registry=registry())
+    except OSError as e:
+        logger.warning(f"Could not serve worker metrics on port {port}: {e}")
+        return
+    logger.info(f"Serving worker metrics on port {port}")
+
+
+@worker_process_shutdown.connect
+def mark_process_dead(pid=None, **extra):
+    if multiprocess_mode():
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,71 @@
+import time
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from . import metrics
+
+
+class RequestTimingMiddleware:
+    """
+    Records the time of every HTTP request by method, view name and status.
+    Requests that match no URL are grouped under one label so scanners
+    can't create a series per path.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else 'unmatched'
+        metrics.HTTP_SECONDS.labels(request.method, view, response.status_code).observe(
+            time.perf_counter() - start)
+        return response
+
+
+# Subprotocol that marks the next offered subprotocol as an access token,
+# for browsers, which cannot set headers on a WebSocket
+TOKEN_SUBPROTOCOL = "bearer"
+
+
+def websocket_token(scope):
+    """
+    The JWT from Sec-WebSocket-Protocol: bearer, <token>. Never taken from
+    the query string, which ends up in proxy and server access logs.
+    """
+    subprotocols = scope.get("subprotocols") or []
+    if TOKEN_SUBPROTOCOL in subprotocols:
+        index = subprotocols.index(TOKEN_SUBPROTOCOL) + 1
+        if index < len(subprotocols):
+            return subprotocols[index]
+    return None
+
+
+@database_sync_to_async
+def user_for_token(raw):
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw))
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticates WebSocket connections with the same access tokens as the
+    REST API. Connections without a token keep the user set by the session
+    middleware around it; an invalid token makes the user anonymous.
+    """
+
+    async def __call__(self, scope, receive, send):
+        token = websocket_token(scope)
+        if token:
+            scope = dict(scope, user=await user_for_token(token))
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_audiolecture_flashcards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audiolecture',
+            name='normalized_audio_file',
+            field=models.FileField(blank=True, null=True, upload_to='lectures/'),
+        ),
+    ]
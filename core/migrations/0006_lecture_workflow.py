@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:34
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_content_hash_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureWorkflow',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(default='running', max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workflows', to='core.audiolecture')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WorkflowStage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32)),
+                ('order', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(default='pending', max_length=16)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('workflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stages', to='core.lectureworkflow')),
+            ],
+            options={
+                'ordering': ['order'],
+                'unique_together': {('workflow', 'name')},
+            },
+        ),
+    ]
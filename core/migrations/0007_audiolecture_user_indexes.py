@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_lecture_workflow'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='audiolecture',
+            index=models.Index(fields=['user', '-created_at'], name='lecture_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='audiolecture',
+            index=models.Index(fields=['user', 'status'], name='lecture_user_status_idx'),
+        ),
+    ]
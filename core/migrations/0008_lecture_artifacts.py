@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+ARTIFACT_FIELDS = [('transcript', 1), ('summary', 2), ('flashcards', 3)]
+STATUS_CODES = {'In progress': 1, 'Successful': 2, 'Failed': 3}
+
+
+def move_text_to_artifacts(apps, schema_editor):
+    AudioLecture = apps.get_model('core', 'AudioLecture')
+    LectureArtifact = apps.get_model('core', 'LectureArtifact')
+    batch = []
+    lectures = AudioLecture.objects.only('id', 'transcript', 'summary', 'flashcards', 'status')
+    for lecture in lectures.iterator(chunk_size=500):
+        for field, kind in ARTIFACT_FIELDS:
+            text = getattr(lecture, field)
+            if text:
+                batch.append(LectureArtifact(
+                    lecture_id=lecture.id, kind=kind, version=1, content=text.encode('utf-8'),
+                ))
+        code = STATUS_CODES.get(lecture.status, 0)
+        if code:
+            AudioLecture.objects.filter(id=lecture.id).update(status_code=code)
+        if len(batch) >= 500:
+            LectureArtifact.objects.bulk_create(batch)
+            batch = []
+    LectureArtifact.objects.bulk_create(batch)
+
+
+def move_artifacts_to_text(apps, schema_editor):
+    import zlib
+
+    AudioLecture = apps.get_model('core', 'AudioLecture')
+    LectureArtifact = apps.get_model('core', 'LectureArtifact')
+    labels = {code: label for label, code in STATUS_CODES.items()}
+    for lecture in AudioLecture.objects.iterator(chunk_size=500):
+        for field, kind in ARTIFACT_FIELDS:
+            artifact = LectureArtifact.objects.filter(lecture_id=lecture.id, kind=kind).order_by('-version').first()
+            if artifact:
+                data = bytes(artifact.content)
+                if artifact.compressed:
+                    data = zlib.decompress(data)
+                setattr(lecture, field, data.decode('utf-8'))
+        lecture.status = labels.get(lecture.status_code)
+        lecture.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_audiolecture_user_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'transcript'), (2, 'summary'), (3, 'flashcards')])),
+                ('version', models.PositiveIntegerField()),
+                ('compressed', models.BooleanField(default=False)),
+                ('content', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='artifacts', to='core.audiolecture')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('lecture', 'kind', 'version'), name='artifact_version_unique')],
+            },
+        ),
+        migrations.AddField(
+            model_name='audiolecture',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Pending'), (1, 'In progress'), (2, 'Successful'), (3, 'Failed')], default=0),
+        ),
+        migrations.RunPython(move_text_to_artifacts, move_artifacts_to_text),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Kept apart from 0008 so the schema changes don't run in the same
+    # transaction as the data copy (PostgreSQL refuses to ALTER a table
+    # with pending deferred FK checks).
+
+    dependencies = [
+        ('core', '0008_lecture_artifacts'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='audiolecture',
+            name='lecture_user_status_idx',
+        ),
+        migrations.RemoveField(
+            model_name='audiolecture',
+            name='status',
+        ),
+        migrations.RenameField(
+            model_name='audiolecture',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.AddIndex(
+            model_name='audiolecture',
+            index=models.Index(fields=['user', 'status'], name='lecture_user_status_idx'),
+        ),
+        migrations.RemoveField(
+            model_name='audiolecture',
+            name='flashcards',
+        ),
+        migrations.RemoveField(
+            model_name='audiolecture',
+            name='summary',
+        ),
+        migrations.RemoveField(
+            model_name='audiolecture',
+            name='transcript',
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:12
+
+import re
+import zlib
+
+from django.db import migrations
+
+# The search index is vendor specific and has no model: a tsvector column
+# with a GIN index on PostgreSQL and an FTS5 virtual table on SQLite.
+POSTGRES_CREATE = [
+    """
+    CREATE TABLE core_lecturesearch (
+        id bigserial PRIMARY KEY,
+        lecture_id bigint NOT NULL REFERENCES core_audiolecture (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        user_id bigint NULL,
+        kind smallint NOT NULL,
+        start_ms integer NULL,
+        body text NOT NULL,
+        document tsvector GENERATED ALWAYS AS (to_tsvector('english', body)) STORED
+    )
+    """,
+    "CREATE INDEX core_lecturesearch_document_idx ON core_lecturesearch USING GIN (document)",
+    "CREATE INDEX core_lecturesearch_lecture_idx ON core_lecturesearch (lecture_id, kind)",
+    "CREATE INDEX core_lecturesearch_user_idx ON core_lecturesearch (user_id)",
+]
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE core_lecturesearch USING fts5(
+        body, lecture_id UNINDEXED, user_id UNINDEXED, kind UNINDEXED, start_ms UNINDEXED,
+        tokenize='porter unicode61'
+    )
+    """,
+]
+TRANSCRIPT, SUMMARY = 1, 2
+INDEXED_KINDS = (TRANSCRIPT, SUMMARY)
+
+# Frozen copies of search.PASSAGE_TOKENS and a character-based
+# summarization.split_text, so the backfill never changes with app code or
+# depends on whether a tokenizer loads during migrate
+PASSAGE_TOKENS = 250
+CHARS_PER_TOKEN = 4
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_passages(text, max_tokens=PASSAGE_TOKENS):
+    units = []
+    for paragraph in PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append(paragraph)
+            continue
+        for sentence in SENTENCE_RE.split(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                units.append(sentence)
+                continue
+            words = sentence.split()
+            step = max(1, max_tokens * CHARS_PER_TOKEN // 6)
+            units.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+
+    passages, current, current_tokens = [], [], 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            passages.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_CREATE
+    elif vendor == 'sqlite':
+        statements = SQLITE_CREATE
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+    AudioLecture = apps.get_model('core', 'AudioLecture')
+    LectureArtifact = apps.get_model('core', 'LectureArtifact')
+    owners = dict(AudioLecture.objects.values_list('id', 'user_id'))
+    latest = {}
+    for artifact in LectureArtifact.objects.filter(kind__in=INDEXED_KINDS).order_by('version').iterator(chunk_size=500):
+        latest[(artifact.lecture_id, artifact.kind)] = artifact
+
+    rows = []
+    for (lecture_id, kind), artifact in latest.items():
+        data = bytes(artifact.content)
+        if artifact.compressed:
+            data = zlib.decompress(data)
+        text = data.decode('utf-8')
+        # Passages as index_artifact() writes them; these transcripts have no timings yet
+        passages = split_passages(text) if kind == TRANSCRIPT else [text]
+        rows.extend(
+            (lecture_id, owners.get(lecture_id), kind, None, passage)
+            for passage in passages if passage.strip()
+        )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO core_lecturesearch (lecture_id, user_id, kind, start_ms, body) VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute("DROP TABLE IF EXISTS core_lecturesearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_remove_audiolecture_text_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
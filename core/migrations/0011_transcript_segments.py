@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_lecture_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_ms', models.PositiveIntegerField()),
+                ('end_ms', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='core.audiolecture')),
+            ],
+            options={
+                'ordering': ['start_ms'],
+                'indexes': [models.Index(fields=['lecture', 'start_ms'], name='segment_lecture_start_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_flashcards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='start_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,24 +1,296 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+import uuid
+import zlib
+
+from . import metrics
+
+
+class LectureStatus(models.IntegerChoices):
+    PENDING = 0, 'Pending'
+    IN_PROGRESS = 1, 'In progress'
+    SUCCESSFUL = 2, 'Successful'
+    FAILED = 3, 'Failed'
+
+
+class ArtifactKind(models.IntegerChoices):
+    TRANSCRIPT = 1, 'transcript'
+    SUMMARY = 2, 'summary'
+    FLASHCARDS = 3, 'flashcards'
 
 
 class AudioLecture(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     audio_file = models.FileField(upload_to='lectures/')
-    transcript = models.TextField(blank=True, null=True)
-    flashcards = models.TextField(blank=True,null=True)
-    summary = models.TextField(blank=True, null=True)
-    status = models.TextField(blank= True,null=True)
+    normalized_audio_file = models.FileField(upload_to='lectures/', blank=True, null=True)
+    audio_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    status = models.PositiveSmallIntegerField(choices=LectureStatus.choices, default=LectureStatus.PENDING)
     pdf_file = models.FileField(upload_to='summaries/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # "my recent lectures" and "my lectures in state X"
+            models.Index(fields=['user', '-created_at'], name='lecture_user_created_idx'),
+            models.Index(fields=['user', 'status'], name='lecture_user_status_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+    # Transcript, summary and flashcards live in LectureArtifact so the
+    # lecture row stays small; these read the latest version of each.
+    def get_artifact(self, kind):
+        cache = self.__dict__.setdefault('_artifacts', {})
+        if kind not in cache:
+            artifact = self.artifacts.filter(kind=kind).order_by('-version').first()
+            cache[kind] = artifact.text if artifact else None
+        return cache[kind]
+
+    def save_artifact(self, kind, text):
+        artifact = LectureArtifact.create_version(self, kind, text)
+        self.__dict__.setdefault('_artifacts', {})[kind] = text
+        return artifact
+
+    def set_status(self, status):
+        AudioLecture.objects.filter(pk=self.pk).update(status=status)
+        self.status = status
+
+    @property
+    def transcript(self):
+        return self.get_artifact(ArtifactKind.TRANSCRIPT)
+
+    @property
+    def summary(self):
+        return self.get_artifact(ArtifactKind.SUMMARY)
+
+    @property
+    def flashcards(self):
+        return self.get_artifact(ArtifactKind.FLASHCARDS)
+
+
+class LectureArtifact(models.Model):
+    """
+    A versioned text output of the pipeline. Large bodies are stored
+    zlib-compressed when ARTIFACT_COMPRESSION is on.
+    """
+    lecture = models.ForeignKey(AudioLecture, on_delete=models.CASCADE, related_name='artifacts')
+    kind = models.PositiveSmallIntegerField(choices=ArtifactKind.choices)
+    version = models.PositiveIntegerField()
+    compressed = models.BooleanField(default=False)
+    content = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['lecture', 'kind', 'version'], name='artifact_version_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.lecture_id}:{self.get_kind_display()} v{self.version}"
+
+    @property
+    def text(self):
+        data = bytes(self.content)
+        if self.compressed:
+            data = zlib.decompress(data)
+        return data.decode('utf-8')
+
+    @staticmethod
+    def encode(text):
+        data = text.encode('utf-8')
+        if settings.ARTIFACT_COMPRESSION and len(data) >= settings.ARTIFACT_COMPRESS_MIN_BYTES:
+            return zlib.compress(data, 6), True
+        return data, False
+
+    @classmethod
+    def create_version(cls, lecture, kind, text):
+        content, compressed = cls.encode(text)
+        with metrics.timed(metrics.DB_WRITE_SECONDS, operation='artifact'):
+            latest = cls.objects.filter(lecture=lecture, kind=kind).aggregate(v=Max('version'))['v']
+            return cls.objects.create(
+                lecture=lecture, kind=kind, version=(latest or 0) + 1,
+                content=content, compressed=compressed,
+            )
+
+
+class TranscriptSegment(models.Model):
+    """
+    A timed piece of the latest transcript, so clients can fetch the text
+    around an audio offset without loading the whole transcript.
+    """
+    lecture = models.ForeignKey(AudioLecture, on_delete=models.CASCADE, related_name='segments')
+    start_ms = models.PositiveIntegerField()
+    end_ms = models.PositiveIntegerField()
+    text = models.TextField()
+
+    class Meta:
+        ordering = ['start_ms']
+        indexes = [
+            models.Index(fields=['lecture', 'start_ms'], name='segment_lecture_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.lecture_id}@{self.start_ms}ms"
+
+    @classmethod
+    def replace_for(cls, lecture, segments):
+        """
+        Replaces the lecture's segments with (start_ms, end_ms, text) tuples.
+        """
+        with metrics.timed(metrics.DB_WRITE_SECONDS, operation='segments'):
+            cls.objects.filter(lecture=lecture).delete()
+            return cls.objects.bulk_create(
+                [cls(lecture=lecture, start_ms=start, end_ms=end, text=text) for start, end, text in segments],
+                batch_size=1000,
+            )
+
+
+class Flashcard(models.Model):
+    """
+    One generated question/answer pair with its SM-2 review schedule. user
+    is copied from the lecture so a user's due cards come from one index.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='flashcards')
+    lecture = models.ForeignKey(AudioLecture, on_delete=models.CASCADE, related_name='cards')
+    position = models.PositiveSmallIntegerField()
+    question = models.TextField()
+    answer = models.TextField()
+    # Where in the audio the card's source passage is spoken, when known
+    start_ms = models.PositiveIntegerField(blank=True, null=True)
+    ease_factor = models.FloatField(default=2.5)
+    interval_days = models.PositiveIntegerField(default=0)
+    repetitions = models.PositiveIntegerField(default=0)
+    lapses = models.PositiveIntegerField(default=0)
+    due_at = models.DateTimeField(default=timezone.now)
+    last_reviewed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['lecture', 'position']
+        indexes = [
+            models.Index(fields=['user', 'due_at'], name='flashcard_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.question[:50]
+
+    @classmethod
+    def replace_for(cls, lecture, cards):
+        """
+        Replaces the lecture's cards with (question, answer, start_ms)
+        tuples. Cards that are unchanged keep their review history.
+        """
+        existing = {(c.question, c.answer): c for c in cls.objects.filter(lecture=lecture)}
+        kept, new = [], []
+        for position, (question, answer, start_ms) in enumerate(cards):
+            card = existing.pop((question, answer), None)
+            if card:
+                card.position = position
+                card.start_ms = start_ms
+                kept.append(card)
+            else:
+                new.append(cls(user_id=lecture.user_id, lecture=lecture, position=position,
+                               question=question, answer=answer, start_ms=start_ms))
+        with metrics.timed(metrics.DB_WRITE_SECONDS, operation='flashcards'), transaction.atomic():
+            cls.objects.filter(id__in=[c.id for c in existing.values()]).delete()
+            cls.objects.bulk_update(kept, ['position', 'start_ms'])
+            cls.objects.bulk_create(new)
+        return kept + new
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload sent in parts straight to the part store (S3
+    multipart or local part files). The lecture is created once the parts
+    have been assembled and hashed.
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('finalizing', 'Finalizing'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploads')
+    title = models.CharField(max_length=255)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    part_size = models.PositiveIntegerField()
+    key = models.CharField(max_length=512)
+    backend_upload_id = models.CharField(max_length=255, blank=True)
+    expected_sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='uploading')
+    error = models.TextField(blank=True)
+    lecture = models.OneToOneField(AudioLecture, on_delete=models.SET_NULL, blank=True, null=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    @property
+    def part_count(self):
+        return max(1, -(-self.size // self.part_size))
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+
+class CachedResult(models.Model):
+    """
+    Content-addressed store for model outputs. The key is a hash of the
+    input content, model and prompt, so identical uploads share one result.
+    """
+    kind = models.CharField(max_length=32)
+    key = models.CharField(max_length=64, unique=True)
+    value = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind}:{self.key}"
+
+
+class LectureWorkflow(models.Model):
+    """
+    One run of the transcribe -> summarize/flashcards -> PDF pipeline.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    lecture = models.ForeignKey(AudioLecture, on_delete=models.CASCADE, related_name='workflows')
+    status = models.CharField(max_length=16, default='running')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.lecture} ({self.status})"
+
+
+class WorkflowStage(models.Model):
+    workflow = models.ForeignKey(LectureWorkflow, on_delete=models.CASCADE, related_name='stages')
+    name = models.CharField(max_length=32)
+    order = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=16, default='pending')
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['order']
+        unique_together = ('workflow', 'name')
+
+    @property
+    def duration_ms(self):
+        if self.started_at and self.finished_at:
+            return int((self.finished_at - self.started_at).total_seconds() * 1000)
+        return None
+
+    def __str__(self):
+        return f"{self.name}: {self.status}"
+
 
 class CustomUser(AbstractUser):
     email = models.EmailField(unique=True)
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from celery import current_task
+from celery.signals import task_postrun
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from . import events, metrics
+
+logger = logging.getLogger(__name__)
+
+# While buffered, a newer event of this type from the same task to the same
+# group replaces the older one; each update describes the whole current status.
+COALESCED_EVENTS = {"status_update"}
+FLUSH_TIMEOUT = 5
+
+
+class Notifier:
+    """
+    Sends worker-side WebSocket events through one channel layer held on a
+    private event loop thread, so tasks don't set up a loop and a Redis
+    connection per message. Events are buffered per group for
+    NOTIFY_COALESCE_MS, a task's successive status updates collapse to the
+    latest, and each batch is logged and sent together. All buffer state
+    lives on the loop thread; callers only schedule work onto it.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="ws-notifier", daemon=True)
+        self.thread.start()
+        self.layer = None
+        self.pending = {}
+        self.counts = defaultdict(Counter)
+        self.flush_lock = None
+
+    def notify(self, group_name, event_type, data):
+        task_id = current_task.request.id if current_task else None
+        self.loop.call_soon_threadsafe(self._add, group_name, event_type, data, task_id)
+
+    def _add(self, group_name, event_type, data, task_id):
+        self.counts[task_id]["queued"] += 1
+        metrics.WS_MESSAGES.labels("queued").inc()
+        buffered = self.pending.get(group_name)
+        if buffered is None:
+            buffered = self.pending[group_name] = []
+            self.loop.call_later(self.window, lambda: self.loop.create_task(self._flush(group_name)))
+        last = buffered[-1] if buffered else None
+        if last and last[0] == event_type and last[2] == task_id and event_type in COALESCED_EVENTS:
+            # Not merged: keys of the older update (a retry_in, an error message)
+            # would otherwise stick to a status they no longer describe
+            last[1] = data
+            self.counts[task_id]["coalesced"] += 1
+            metrics.WS_MESSAGES.labels("coalesced").inc()
+        else:
+            buffered.append([event_type, data, task_id])
+
+    async def _flush(self, group_name):
+        if self.flush_lock is None:
+            self.flush_lock = asyncio.Lock()
+        async with self.flush_lock:
+            batch = self.pending.pop(group_name, None)
+            if not batch:
+                return
+            if self.layer is None:
+                self.layer = get_channel_layer()
+            start = time.perf_counter()
+            seqs = await self.loop.run_in_executor(
+                None, events.record_many, group_name, [(event_type, data) for event_type, data, _ in batch]
+            )
+            # One at a time: concurrent group_sends may go out on different
+            # pooled connections and overtake each other, and deltas carry no
+            # seq the client could reorder by
+            for (event_type, data, task_id), seq in zip(batch, seqs):
+                try:
+                    await self.layer.group_send(group_name, {
+                        "type": "send_event", "event": event_type, "data": data, "seq": seq,
+                    })
+                except Exception as e:
+                    logger.warning(f"Could not send {event_type} to {group_name}: {e}")
+                    metrics.WS_MESSAGES.labels("failed").inc()
+                    continue
+                self.counts[task_id]["sent"] += 1
+                metrics.WS_MESSAGES.labels("sent").inc()
+            metrics.WS_FLUSH_SECONDS.observe(time.perf_counter() - start)
+
+    async def _flush_all(self, task_id):
+        for group_name in list(self.pending):
+            await self._flush(group_name)
+        return dict(self.counts.pop(task_id, {}))
+
+    def flush(self, task_id=None):
+        """
+        Sends everything buffered and returns the message counts recorded
+        for task_id ({"queued", "coalesced", "sent"}).
+        """
+        future = asyncio.run_coroutine_threadsafe(self._flush_all(task_id), self.loop)
+        return future.result(timeout=FLUSH_TIMEOUT)
+
+
+_notifier = None
+_notifier_pid = None
+
+
+def get_notifier():
+    """
+    Returns this process's notifier; a forked child starts its own loop thread.
+    """
+    global _notifier, _notifier_pid
+    if _notifier is None or _notifier_pid != os.getpid():
+        _notifier = Notifier(settings.NOTIFY_COALESCE_MS / 1000)
+        _notifier_pid = os.getpid()
+    return _notifier
+
+
+@task_postrun.connect
+def flush_task_notifications(sender=None, task_id=None, **extra):
+    if _notifier is None or _notifier_pid != os.getpid():
+        return
+    try:
+        counts = _notifier.flush(task_id)
+    except Exception as e:
+        logger.warning(f"Could not flush notifications for task {task_id}: {e}")
+        return
+    if counts:
+        logger.info(f"Task {sender.name if sender else task_id} [{task_id}] notifications: {counts}")
+        events.record_task_counts(sender.name if sender else "unknown", counts)
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class LectureCursorPagination(CursorPagination):
+    """
+    Keyset pagination on created_at: each page is an index range scan
+    instead of an OFFSET that gets slower the further the client pages.
+    """
+    ordering = '-created_at'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import os
+
+from django.conf import settings
+from fpdf import FPDF
+
+logger = logging.getLogger(__name__)
+
+# Part of the render key; bump it whenever the layout changes so stored
+# PDFs from the old layout are not reused.
+RENDERER_VERSION = "2"
+SECTIONS = ("summary", "flashcards", "transcript")
+DEFAULT_SECTIONS = ("summary",)
+SECTION_TITLES = {"summary": "Summary", "flashcards": "Flashcards", "transcript": "Transcript"}
+UNICODE_FONT = "DejaVu"
+# Consecutive transcript segments printed as one timestamped paragraph.
+SEGMENTS_PER_PARAGRAPH = 8
+
+
+def pdf_sections(sections=None):
+    """
+    The requested sections in document order; unknown names are ignored.
+    """
+    chosen = tuple(s for s in SECTIONS if s in (sections or ()))
+    return chosen or DEFAULT_SECTIONS
+
+
+def unicode_fonts_available():
+    return os.path.exists(settings.PDF_FONT_PATH) and os.path.exists(settings.PDF_FONT_BOLD_PATH)
+
+
+def render_key(lecture, sections):
+    """
+    Hash of everything that ends up in the PDF, so an unchanged lecture
+    maps to the file that was already rendered for it.
+    """
+    digest = hashlib.sha256()
+    font = "unicode" if unicode_fonts_available() else "core"
+    for part in (RENDERER_VERSION, font, lecture.title, *sections):
+        digest.update(part.encode("utf-8") + b"\x1f")
+    for section in sections:
+        digest.update((getattr(lecture, section) or "").encode("utf-8") + b"\x1e")
+    return digest.hexdigest()
+
+
+def pdf_name(lecture, sections):
+    return f"summaries/{render_key(lecture, sections)}.pdf"
+
+
+class LecturePDF(FPDF):
+    def __init__(self):
+        super().__init__()
+        self._word_widths = {}
+        self.set_auto_page_break(True, margin=15)
+        if unicode_fonts_available():
+            self.add_font(UNICODE_FONT, "", settings.PDF_FONT_PATH)
+            self.add_font(UNICODE_FONT, "B", settings.PDF_FONT_BOLD_PATH)
+            self.family = UNICODE_FONT
+            self.unicode = True
+        else:
+            logger.warning("Unicode PDF fonts not found; falling back to Helvetica (Latin-1 only)")
+            self.family = "Helvetica"
+            self.unicode = False
+
+    def clean(self, text):
+        if self.unicode:
+            return text
+        return text.encode("latin-1", "replace").decode("latin-1")
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font(self.family, size=8)
+        self.cell(0, 8, str(self.page_no()), align="C")
+
+    def heading(self, text, size=14):
+        self.set_font(self.family, "B", size)
+        self.multi_cell(0, 10, self.clean(text), new_x="LMARGIN", new_y="NEXT")
+        self.ln(2)
+        self.set_font(self.family, size=11)
+
+    def word_width(self, word):
+        # fpdf2's multi_cell re-measures the line for every character, which
+        # is quadratic in paragraph length; measuring each distinct word once
+        # keeps long transcripts linear
+        key = (self.font_family, self.font_style, self.font_size_pt, word)
+        width = self._word_widths.get(key)
+        if width is None:
+            width = self._word_widths[key] = self.get_string_width(word)
+        return width
+
+    def wrap(self, text):
+        """
+        Greedy word wrap of one paragraph to the page width.
+        """
+        max_width = self.epw
+        space = self.word_width(" ")
+        line, width = [], 0
+        for word in text.split():
+            w = self.word_width(word)
+            if line and width + space + w > max_width:
+                yield " ".join(line)
+                line, width = [], 0
+            if line:
+                width += space
+            line.append(word)
+            width += w
+        if line:
+            yield " ".join(line)
+
+    def paragraph(self, text):
+        text = self.clean(text.strip())
+        if text:
+            for line in self.wrap(text):
+                if self.word_width(line) > self.epw:
+                    # a single word wider than the page (a long URL); let fpdf split it
+                    self.multi_cell(0, 6, line, new_x="LMARGIN", new_y="NEXT")
+                else:
+                    self.cell(0, 6, line, new_x="LMARGIN", new_y="NEXT")
+            self.ln(2)
+
+
+def _timestamp(ms):
+    seconds = ms // 1000
+    return f"{seconds // 3600:d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def transcript_paragraphs(lecture):
+    """
+    Yields transcript paragraphs, reading timed segments from the database
+    in batches when the lecture has them.
+    """
+    segments = lecture.segments.values_list("start_ms", "text").iterator(chunk_size=500)
+    batch = []
+    for start_ms, text in segments:
+        batch.append((start_ms, text))
+        if len(batch) == SEGMENTS_PER_PARAGRAPH:
+            yield f"[{_timestamp(batch[0][0])}] " + " ".join(t for _, t in batch)
+            batch = []
+    if batch:
+        yield f"[{_timestamp(batch[0][0])}] " + " ".join(t for _, t in batch)
+        return
+    if not lecture.segments.exists():
+        yield from (lecture.transcript or "").split("\n")
+
+
+def render_lecture_pdf(lecture, sections, path, on_progress=None):
+    """
+    Writes the chosen sections of a lecture to path and returns the page
+    count. Transcript paragraphs are read from the database and laid out
+    one at a time rather than as one large string.
+    """
+    pdf = LecturePDF()
+    pdf.set_title(lecture.title)
+    pdf.add_page()
+    pdf.heading(lecture.title[:200], size=16)
+
+    for i, section in enumerate(sections):
+        if on_progress:
+            on_progress(section)
+        if i > 0:
+            pdf.add_page()
+        pdf.heading(SECTION_TITLES[section])
+        if section == "transcript":
+            paragraphs = transcript_paragraphs(lecture)
+        else:
+            paragraphs = (getattr(lecture, section) or f"No {section} available").split("\n")
+        for paragraph in paragraphs:
+            pdf.paragraph(paragraph)
+
+    pdf.output(path)
+    return pdf.page_no()
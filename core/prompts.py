@@ -0,0 +1,53 @@
+"""
+Builds LLM prompts within a token budget from the smallest input that
+serves the purpose, and records how many tokens each prompt uses.
+"""
+from django.conf import settings
+
+from . import metrics
+from .flashcards import FLASHCARDS_PROMPT
+from .tokens import compact_whitespace, estimate_tokens, truncate_to_tokens
+
+
+def fit(template, text, budget, **fields):
+    """
+    Fills template's {text} with text, whitespace compacted and cut so the
+    whole prompt stays within budget tokens. Returns (prompt, truncated).
+    """
+    text = compact_whitespace(text)
+    available = max(0, budget - estimate_tokens(template.format(text="", **fields)))
+    fitted = truncate_to_tokens(text, available)
+    return template.format(text=fitted, **fields), fitted != text
+
+
+def record(purpose, prompt, truncated=False):
+    """
+    Counts the prompt's tokens into the metrics and returns the count.
+    """
+    tokens = estimate_tokens(prompt)
+    metrics.PROMPT_TOKENS.labels(purpose).observe(tokens)
+    if truncated:
+        metrics.PROMPTS_TRUNCATED.labels(purpose).inc()
+    return tokens
+
+
+def flashcards_source(lecture, has_summary):
+    """
+    The smaller of the transcript and, when the lecture has a real one (the
+    artifact may hold an error message instead), the summary. For a long
+    lecture that is the summary, which keeps the key points at a fraction of
+    the tokens. Returns (name, text).
+    """
+    transcript = lecture.transcript or ""
+    if has_summary and estimate_tokens(lecture.summary) < estimate_tokens(transcript):
+        return "summary", lecture.summary
+    return "transcript", transcript
+
+
+def flashcards_prompt(lecture, has_summary):
+    """
+    Returns (prompt, source name, truncated).
+    """
+    source, text = flashcards_source(lecture, has_summary)
+    prompt, truncated = fit(FLASHCARDS_PROMPT, text, settings.FLASHCARDS_INPUT_TOKENS)
+    return prompt, source, truncated
@@ -0,0 +1,136 @@
+import logging
+import time
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Refills every bucket in KEYS to "now" and, if all of them hold enough,
+# takes the cost from each. Returns {wait_seconds, level_1, level_2, ...}
+# as strings (Lua numbers would be truncated to integers in the reply).
+# ARGV holds capacity, refill rate per second and cost for each key in turn.
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local rate = tonumber(ARGV[i * 3 - 1])
+    local cost = math.min(tonumber(ARGV[i * 3]), capacity)
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if cost > tokens then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+local reply = {tostring(wait)}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local rate = tonumber(ARGV[i * 3 - 1])
+    if wait == 0 then
+        levels[i] = levels[i] - math.min(tonumber(ARGV[i * 3]), capacity)
+        redis.call('HSET', key, 'tokens', tostring(levels[i]), 'ts', tostring(now))
+        redis.call('EXPIRE', key, math.ceil(capacity / rate) + 60)
+    end
+    reply[i + 1] = tostring(levels[i])
+end
+return reply
+"""
+
+_script = None
+
+
+class RateLimited(Exception):
+    def __init__(self, model, retry_after):
+        self.model = model
+        self.retry_after = retry_after
+        super().__init__(f"Rate limit for {model} exhausted; retry in {retry_after:.1f}s")
+
+
+def _buckets(model, tokens):
+    """
+    Returns [(key, capacity, refill_per_second, cost)] for the per-minute
+    request and token limits configured for model.
+    """
+    limits = settings.LLM_RATE_LIMITS.get(model, {})
+    buckets = []
+    if limits.get("rpm"):
+        buckets.append((f"ratelimit:{model}:rpm", limits["rpm"], limits["rpm"] / 60.0, 1))
+    if limits.get("tpm"):
+        buckets.append((f"ratelimit:{model}:tpm", limits["tpm"], limits["tpm"] / 60.0, tokens))
+    return buckets
+
+
+def _run(buckets):
+    global _script
+    if _script is None:
+        _script = get_redis().register_script(ACQUIRE_SCRIPT)
+    args = []
+    for _, capacity, rate, cost in buckets:
+        args.extend([capacity, rate, cost])
+    reply = _script(keys=[b[0] for b in buckets], args=args)
+    return float(reply[0]), [float(level) for level in reply[1:]]
+
+
+def try_acquire(model, tokens=0):
+    """
+    Takes one request and `tokens` tokens from the model's shared buckets.
+    Returns 0 when granted, otherwise the seconds until enough has refilled.
+    Fails open if Redis is unreachable so an outage does not stop all work.
+    """
+    buckets = _buckets(model, tokens)
+    if not buckets:
+        return 0.0
+    try:
+        wait, _ = _run(buckets)
+    except RedisError as e:
+        logger.warning(f"Rate limiter unavailable, allowing call to {model}: {e}")
+        return 0.0
+    return wait
+
+
+def acquire(model, tokens=0, max_wait=None):
+    """
+    Waits for capacity for up to max_wait seconds, then raises RateLimited
+    so the caller can reschedule instead of holding a worker slot.
+    """
+    if max_wait is None:
+        max_wait = settings.RATE_LIMIT_MAX_WAIT
+    deadline = time.monotonic() + max_wait
+    while True:
+        wait = try_acquire(model, tokens)
+        if wait <= 0:
+            return
+        if time.monotonic() + wait > deadline:
+            raise RateLimited(model, wait)
+        time.sleep(wait)
+
+
+def bucket_levels():
+    """
+    Current fill level of every configured bucket, for monitoring.
+    """
+    levels = {}
+    for model in settings.LLM_RATE_LIMITS:
+        buckets = _buckets(model, 0)
+        if not buckets:
+            continue
+        # Zero-cost buckets only get refilled, never drained.
+        zero_cost = [(key, capacity, rate, 0) for key, capacity, rate, _ in buckets]
+        try:
+            _, current = _run(zero_cost)
+        except RedisError as e:
+            logger.warning(f"Could not read rate limiter levels: {e}")
+            return {}
+        levels[model] = {
+            key.rsplit(":", 1)[1]: {"capacity": capacity, "available": round(level, 1)}
+            for (key, capacity, _, _), level in zip(buckets, current)
+        }
+    return levels
@@ -0,0 +1,158 @@
+import logging
+
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import metrics
+from .models import ArtifactKind, AudioLecture
+from .summarization import split_text
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "core_lecturesearch"
+# Transcripts are indexed as passages so ranking and snippets point at the
+# part of the lecture that matched rather than the whole recording.
+PASSAGE_TOKENS = 250
+INDEXED_KINDS = {ArtifactKind.TRANSCRIPT, ArtifactKind.SUMMARY}
+
+POSTGRES_SEARCH_SQL = f"""
+    SELECT hit.lecture_id, hit.kind, hit.start_ms, hit.title, hit.created_at, hit.rank,
+           ts_headline('english', hit.body, hit.query,
+                       'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10')
+    FROM (
+        SELECT s.lecture_id, s.kind, s.start_ms, s.body, a.title, a.created_at, q AS query,
+               ts_rank_cd(s.document, q) AS rank
+        FROM {SEARCH_TABLE} s
+        JOIN core_audiolecture a ON a.id = s.lecture_id,
+             websearch_to_tsquery('english', %s) q
+        WHERE s.user_id = %s AND s.document @@ q
+        ORDER BY rank DESC
+        LIMIT %s
+    ) hit
+    ORDER BY hit.rank DESC
+"""
+
+SQLITE_SEARCH_SQL = f"""
+    SELECT {SEARCH_TABLE}.lecture_id, {SEARCH_TABLE}.kind, {SEARCH_TABLE}.start_ms,
+           a.title, a.created_at, -bm25({SEARCH_TABLE}) AS rank,
+           snippet({SEARCH_TABLE}, 0, '<mark>', '</mark>', '…', 24)
+    FROM {SEARCH_TABLE}
+    JOIN core_audiolecture a ON a.id = {SEARCH_TABLE}.lecture_id
+    WHERE {SEARCH_TABLE} MATCH %s AND {SEARCH_TABLE}.user_id = %s
+    ORDER BY rank DESC
+    LIMIT %s
+"""
+
+
+def is_supported():
+    return connection.vendor in ("postgresql", "sqlite")
+
+
+def _passages(kind, text):
+    if kind == ArtifactKind.TRANSCRIPT:
+        return [(None, passage) for passage in split_text(text, PASSAGE_TOKENS)]
+    return [(None, text)]
+
+
+def segment_passages(segments, max_tokens=PASSAGE_TOKENS):
+    """
+    Groups consecutive (start_ms, end_ms, text) segments into passages that
+    start at the offset of their first segment.
+    """
+    passages = []
+    start_ms, texts, tokens = None, [], 0
+    for seg_start, _, text in segments:
+        seg_tokens = estimate_tokens(text)
+        if texts and tokens + seg_tokens > max_tokens:
+            passages.append((start_ms, " ".join(texts)))
+            texts, tokens = [], 0
+        if not texts:
+            start_ms = seg_start
+        texts.append(text)
+        tokens += seg_tokens
+    if texts:
+        passages.append((start_ms, " ".join(texts)))
+    return passages
+
+
+def index_artifact(lecture, kind, text, passages=None):
+    """
+    Replaces the indexed passages of one artifact of a lecture. passages is
+    an optional list of (start_ms, text); by default the text is split into
+    passages without timestamps.
+    """
+    if kind not in INDEXED_KINDS or not is_supported():
+        return
+    if passages is None:
+        passages = _passages(kind, text or "")
+    rows = [
+        (lecture.id, lecture.user_id, int(kind), start_ms, body)
+        for start_ms, body in passages if body.strip()
+    ]
+    with metrics.timed(metrics.DB_WRITE_SECONDS, operation='search_index'), \
+            transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE lecture_id = %s AND kind = %s",
+            [lecture.id, int(kind)],
+        )
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (lecture_id, user_id, kind, start_ms, body) "
+            f"VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def safe_index_artifact(lecture, kind, text, passages=None):
+    # The index can always be rebuilt; never fail a pipeline stage over it.
+    try:
+        index_artifact(lecture, kind, text, passages)
+    except Exception as e:
+        logger.error(f"Could not update search index for lecture {lecture.id}: {e}", exc_info=True)
+
+
+@receiver(post_delete, sender=AudioLecture)
+def remove_lecture(sender, instance, **kwargs):
+    # FTS5 tables can't declare foreign keys, so nothing cascades there
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE lecture_id = %s", [instance.id])
+
+
+def _fts5_query(query):
+    # Quote every term so user input can't use (or break) FTS5 query syntax
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms if term)
+
+
+def search(user, query, limit=20):
+    """
+    Ranked matches across the user's transcripts and summaries, best first,
+    with a highlighted snippet and the offset of the matching passage.
+    """
+    query = query.strip()
+    if not query or not is_supported():
+        return []
+    if connection.vendor == "postgresql":
+        sql, params = POSTGRES_SEARCH_SQL, [query, user.id, limit]
+    else:
+        sql, params = SQLITE_SEARCH_SQL, [_fts5_query(query), user.id, limit]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [
+        {
+            "lecture_id": lecture_id,
+            "title": title,
+            "kind": ArtifactKind(kind).label,
+            "start_ms": start_ms,
+            "created_at": created_at,
+            "rank": round(float(rank), 4),
+            "snippet": snippet,
+        }
+        for lecture_id, kind, start_ms, title, created_at, rank, snippet in rows
+    ]
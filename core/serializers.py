@@ -1,31 +1,173 @@
 from rest_framework import serializers
-from .models import AudioLecture,CustomUser
+from .models import AudioLecture,CustomUser,Flashcard,LectureWorkflow,WorkflowStage,TranscriptSegment,UploadSession
+from django.conf import settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from . import metrics
+from .cache import file_sha256
+from .storage import media_url
+from .flashcards import MAX_GRADE, MIN_GRADE
 import os
 
 
+ALLOWED_AUDIO_EXTENSIONS = ['.mp3', '.wav', '.m4a']
+
+
+def validate_audio_extension(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in ALLOWED_AUDIO_EXTENSIONS:
+        raise serializers.ValidationError(f"Unsupported file type: {ext}. Only MP3, WAV, or M4A files are allowed.")
+
+
+class SignedFileField(serializers.FileField):
+    """
+    Accepts uploads like FileField but represents the file by a signed,
+    expiring download URL instead of a public media path.
+    """
+    def to_representation(self, value):
+        return media_url(value, self.context.get('request'))
+
+
 class EmptySerializer(serializers.Serializer):
       pass
 
-class AudioLectureSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    Lets GET requests ask for a sparse response with ?fields=id,title,...
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if not request or request.method != 'GET':
+            return
+        requested = requested_fields(request)
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
+def requested_fields(request):
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class AudioLectureListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact list representation; the large text columns are replaced by
+    flags computed in SQL (see AudioLectureViewSet.get_queryset).
+    """
+    has_transcript = serializers.BooleanField(read_only=True)
+    has_summary = serializers.BooleanField(read_only=True)
+    has_flashcards = serializers.BooleanField(read_only=True)
+    status = serializers.CharField(source='get_status_display', read_only=True)
+    audio_file = SignedFileField(read_only=True)
+    pdf_file = SignedFileField(read_only=True)
+
+    class Meta:
+        model = AudioLecture
+        fields = ['id', 'title', 'status', 'audio_file', 'pdf_file', 'created_at',
+                  'has_transcript', 'has_summary', 'has_flashcards']
+
+
+class AudioLectureSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    status = serializers.CharField(source='get_status_display', read_only=True)
+    audio_file = SignedFileField()
+    normalized_audio_file = SignedFileField(read_only=True)
+    pdf_file = SignedFileField(read_only=True)
+    transcript = serializers.CharField(read_only=True)
+    summary = serializers.CharField(read_only=True)
+    flashcards = serializers.CharField(read_only=True)
+
     class Meta:
         model = AudioLecture
         audio_file = serializers.FileField(required=True)
         fields = '__all__'
-        read_only_fields = ['user', 'transcript', 'summary', 'pdf_file', 'created_at']
+        read_only_fields = ['user', 'transcript', 'summary', 'pdf_file', 'normalized_audio_file', 'audio_sha256', 'created_at']
 
     def validate_audio_file(self, value):
-        ext = os.path.splitext(value.name)[1].lower()
-        allowed_extensions = ['.mp3', '.wav', '.m4a']
-        if ext not in allowed_extensions:
-            raise serializers.ValidationError(f"Unsupported file type: {ext}. Only MP3, WAV, or M4A files are allowed.")
+        validate_audio_extension(value.name)
         return value
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
+        # Fingerprint the upload so duplicate recordings reuse cached results
+        validated_data['audio_sha256'] = file_sha256(validated_data['audio_file'])
+        metrics.UPLOAD_BYTES.labels('direct').inc(validated_data['audio_file'].size)
         return super().create(validated_data)
 
 
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', source='expected_sha256', required=False, write_only=True)
+    part_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'title', 'filename', 'size', 'sha256', 'part_size', 'part_count',
+                  'status', 'error', 'lecture', 'created_at', 'completed_at']
+        read_only_fields = ['part_size', 'status', 'error', 'lecture', 'created_at', 'completed_at']
+
+    def validate_filename(self, value):
+        value = os.path.basename(value)
+        validate_audio_extension(value)
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(f"Size must be between 1 and {settings.UPLOAD_MAX_BYTES} bytes.")
+        return value
+
+    def validate_sha256(self, value):
+        return value.lower()
+
+
+class TranscriptSegmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TranscriptSegment
+        fields = ['start_ms', 'end_ms', 'text']
+
+
+class FlashcardSerializer(serializers.ModelSerializer):
+    lecture_title = serializers.CharField(source='lecture.title', read_only=True)
+
+    class Meta:
+        model = Flashcard
+        fields = ['id', 'lecture', 'lecture_title', 'question', 'answer', 'start_ms', 'due_at',
+                  'interval_days', 'ease_factor', 'repetitions', 'lapses', 'last_reviewed_at']
+        read_only_fields = fields
+
+
+class ReviewSerializer(serializers.Serializer):
+    card = serializers.IntegerField()
+    grade = serializers.IntegerField(min_value=MIN_GRADE, max_value=MAX_GRADE)
+
+
+class ReviewBatchSerializer(serializers.Serializer):
+    reviews = ReviewSerializer(many=True, allow_empty=False, max_length=settings.REVIEW_BATCH_MAX)
+
+    def validate_reviews(self, reviews):
+        cards = [r['card'] for r in reviews]
+        if len(set(cards)) != len(cards):
+            raise serializers.ValidationError("Each card may be reviewed once per batch.")
+        return reviews
+
+
+class WorkflowStageSerializer(serializers.ModelSerializer):
+    duration_ms = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = WorkflowStage
+        fields = ['name', 'status', 'started_at', 'finished_at', 'duration_ms', 'error']
+
+
+class LectureWorkflowSerializer(serializers.ModelSerializer):
+    stages = WorkflowStageSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = LectureWorkflow
+        fields = ['id', 'lecture', 'status', 'created_at', 'finished_at', 'stages']
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     tokens = serializers.SerializerMethodField()
 
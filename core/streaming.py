@@ -0,0 +1,74 @@
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DeltaBatcher:
+    """
+    Collects streamed completion fragments and hands them to
+    send(text, seq) at most once per interval, so a fast stream becomes a
+    few WebSocket messages a second instead of one per token. seq restarts
+    at 1 for every stream, which tells clients to drop text from an attempt
+    that was retried.
+    """
+
+    def __init__(self, send, interval=None):
+        self.send = send
+        self.interval = settings.STREAM_FLUSH_INTERVAL if interval is None else interval
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.last_flush = self.started
+        self.buffer = []
+        self.messages = 0
+        self.chars = 0
+
+    def begin(self):
+        """
+        Marks the start of the streamed request that time-to-first-token is
+        measured from.
+        """
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.buffer = []
+        self.messages = 0
+        self.chars = 0
+
+    def add(self, delta):
+        now = time.monotonic()
+        if self.first_token_at is None:
+            self.first_token_at = now
+            # Flush the first fragment right away; it is what the user waits for
+            self.last_flush = now - self.interval
+        self.buffer.append(delta)
+        self.chars += len(delta)
+        if now - self.last_flush >= self.interval:
+            self.flush(now)
+
+    def flush(self, now=None):
+        if not self.buffer:
+            return
+        self.messages += 1
+        self.send("".join(self.buffer), self.messages)
+        self.buffer = []
+        self.last_flush = now or time.monotonic()
+
+    def close(self):
+        """
+        Sends whatever is left and returns the stream statistics.
+        """
+        self.flush()
+        return self.stats()
+
+    def stats(self):
+        ttft = None
+        if self.first_token_at is not None:
+            ttft = round((self.first_token_at - self.started) * 1000)
+        return {
+            "ttft_ms": ttft,
+            "messages": self.messages,
+            "chars": self.chars,
+            "duration_ms": round((time.monotonic() - self.started) * 1000),
+        }
@@ -0,0 +1,181 @@
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from . import cache as result_cache
+from . import metrics, prompts
+from .llm_client import DEFAULT_COMPLETION_TOKENS, error_message, get_client, iter_deltas
+from .tokens import compact_whitespace, estimate_tokens, tokenizer_name
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = "Summarize this: {text}"
+MAP_PROMPT = (
+    "This is part {index} of {total} of a lecture transcript. Summarize it, keeping "
+    "key definitions, facts, formulas and examples:\n\n{text}"
+)
+REDUCE_PROMPT = (
+    "These are summaries of consecutive parts of one lecture. Combine them into a "
+    "single coherent summary without repeating points:\n\n{text}"
+)
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+class LLMResponseError(Exception):
+    pass
+
+
+def _units(text, max_tokens):
+    """
+    Yields paragraphs, falling back to sentences and then word runs for
+    pieces that would not fit in one chunk on their own.
+    """
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE_RE.split(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+                continue
+            words = sentence.split()
+            step = max(1, max_tokens * 4 // 6)  # ~6 characters per word incl. space
+            for i in range(0, len(words), step):
+                yield " ".join(words[i:i + step])
+
+
+def split_text(text, max_tokens):
+    """
+    Packs paragraphs/sentences greedily into chunks of at most max_tokens.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit in _units(text, max_tokens):
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def complete(prompt, stream=None, purpose="summary"):
+    """
+    Runs a single-turn chat completion and returns the reply text. If a
+    DeltaBatcher is given, the reply is streamed and fed to it as it arrives.
+    purpose labels the prompt's token count in the metrics.
+    """
+    prompts.record(purpose, prompt)
+    messages = [{"role": "user", "content": prompt}]
+    if stream is None:
+        response = get_client().chat(messages, settings.LLM_MODEL)
+        data = response.json()
+        if response.status_code != 200 or "choices" not in data:
+            raise LLMResponseError(data.get("error", {}).get("message", "Sorry, data not available"))
+        metrics.record_usage(data)
+        return data["choices"][0]["message"]["content"].strip()
+
+    stream.begin()
+    response = get_client().chat(messages, settings.LLM_MODEL, stream=True)
+    if response.status_code != 200:
+        raise LLMResponseError(error_message(response))
+    parts = []
+    for delta in iter_deltas(response):
+        parts.append(delta)
+        stream.add(delta)
+    return "".join(parts).strip()
+
+
+def complete_part(prompt, purpose):
+    """
+    Like complete(), but keeps the reply: a task rescheduled by the rate
+    limiter then resumes with the parts it already paid for.
+    """
+    parts = (result_cache.text_sha256(prompt), settings.LLM_MODEL)
+    reply = result_cache.get("summary_part", *parts)
+    if reply is None:
+        reply = complete(prompt, None, purpose)
+        result_cache.put("summary_part", reply, *parts)
+    return reply
+
+
+def map_workers():
+    """
+    SUMMARY_MAX_WORKERS, but no more concurrent chunk requests than the
+    model's tokens-per-minute bucket can hold at once.
+    """
+    tpm = settings.LLM_RATE_LIMITS.get(settings.LLM_MODEL, {}).get("tpm")
+    if not tpm:
+        return settings.SUMMARY_MAX_WORKERS
+    per_request = settings.SUMMARY_CHUNK_TOKENS + DEFAULT_COMPLETION_TOKENS
+    return max(1, min(settings.SUMMARY_MAX_WORKERS, tpm // per_request))
+
+
+def _map(chunks, build_prompt, purpose, on_partial=None):
+    results = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=map_workers()) as executor:
+        futures = {
+            executor.submit(complete_part, build_prompt(i, chunk), purpose): i
+            for i, chunk in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if on_partial:
+                on_partial(i + 1, len(chunks), results[i])
+    return results
+
+
+def summarize_text(text, on_partial=None, stream=None):
+    """
+    Summarizes text of any length. Text that fits the chunk budget is sent
+    in one request; longer text is split on paragraph/sentence boundaries,
+    the chunks are summarized in parallel (map) and the partial summaries
+    are combined in as many reduce rounds as needed. Only the request that
+    produces the final summary is streamed.
+    """
+    max_tokens = settings.SUMMARY_CHUNK_TOKENS
+    text = compact_whitespace(text)
+    if estimate_tokens(text) <= max_tokens:
+        return complete(SUMMARY_PROMPT.format(text=text), stream)
+
+    chunks = split_text(text, max_tokens)
+    logger.info(f"Summarizing {len(chunks)} chunks of up to {max_tokens} tokens")
+    partials = _map(
+        chunks,
+        lambda i, chunk: MAP_PROMPT.format(index=i + 1, total=len(chunks), text=chunk),
+        "summary_map",
+        on_partial,
+    )
+
+    while True:
+        combined = "\n\n".join(partials)
+        if estimate_tokens(combined) <= max_tokens or len(partials) == 1:
+            return complete(REDUCE_PROMPT.format(text=combined), stream, "summary_reduce")
+        groups = split_text(combined, max_tokens)
+        if len(groups) >= len(partials):
+            # Regrouping would not shrink the round; pair partials up instead
+            groups = ["\n\n".join(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+        logger.info(f"Reducing {len(partials)} partial summaries into {len(groups)}")
+        partials = _map(groups, lambda i, group: REDUCE_PROMPT.format(text=group), "summary_reduce")
+
+
+def cache_signature():
+    """
+    Everything besides the transcript and model that changes the summary;
+    used as part of the result cache key.
+    """
+    return "\x1f".join([
+        SUMMARY_PROMPT, MAP_PROMPT, REDUCE_PROMPT, str(settings.SUMMARY_CHUNK_TOKENS), tokenizer_name(),
+    ])
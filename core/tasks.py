@@ -1,76 +1,190 @@
 
-import os, requests, logging
-from celery import shared_task
+import os, requests, logging, random, subprocess, time, json, hashlib, tempfile
+from celery import chain, group, shared_task
+from celery.exceptions import Retry
 from django.conf import settings
-from .models import AudioLecture
-from fpdf import FPDF
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from .models import ArtifactKind, AudioLecture, Flashcard, LectureStatus, TranscriptSegment, UploadSession
+from .audio import normalize_audio as normalize_audio_file
+from .transcription import transcribe_lecture_audio
+from .llm_client import error_message, get_client, iter_deltas
+from .streaming import DeltaBatcher
+from .ratelimit import RateLimited
+from .summarization import LLMResponseError, cache_signature, summarize_text
+from .tokens import estimate_tokens
+from . import cache as result_cache
+from . import metrics, prompts, search
+from .notifier import get_notifier
+from .uploads import get_part_store
+from .storage import local_copy, media_url, save_file
+from .pdf import pdf_name, pdf_sections, render_lecture_pdf
+from .flashcards import FlashcardFormatError, as_text, locate, parse_flashcards
+from .workflow import STAGE_SKIPPED, create_workflow, finish_workflow, stage_completed
 from dotenv import load_dotenv
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Redis broker priorities (0 is served first). Single-stage actions a user is
+# waiting on jump ahead of queued batch work such as full workflows.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 7
+
+
+
+def ensure_audio_hash(lecture):
+    if not lecture.audio_sha256:
+        with lecture.audio_file.open("rb") as f:
+            lecture.audio_sha256 = result_cache.file_sha256(f)
+        lecture.save(update_fields=["audio_sha256"])
+    return lecture.audio_sha256
+
+# Counts how often a task was rescheduled by the rate limiter
+THROTTLED_HEADER = "throttled"
+
+
+def reschedule_throttled(task, exc, group_name):
+    """
+    Puts a task that hit the shared rate limit back on the queue for when the
+    bucket refills. Throttling is not a failure: the new attempt keeps the
+    retry count (task.retry would add one) and carries a throttle count in
+    a header instead. Returns the Retry for the caller to raise.
+    """
+    request = task.request
+    throttled = (request.get(THROTTLED_HEADER) or 0) + 1
+    countdown = exc.retry_after + random.uniform(0, 2)
+    logger.info(f"{task.name} throttled on {exc.model} ({throttled}x); rescheduling in {countdown:.1f}s")
+    notify_ws(group_name, "status_update", {"status": "Queued", "retry_in": round(countdown)})
+    sig = task.signature_from_request(
+        request, countdown=countdown, retries=request.retries,
+        headers={**(request.headers or {}), THROTTLED_HEADER: throttled},
+    )
+    if not request.is_eager:
+        # Eager runs apply the signature themselves when they see the Retry
+        sig.apply_async()
+    return Retry(exc=exc, when=countdown, is_eager=request.is_eager, sig=sig)
+
+
 # Utility to send WebSocket messages
 def notify_ws(group_name, event_type, data):
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        group_name,
-        {
-            "type": "send_event",
-            "event": event_type,
-            "data": data,
-        }
-    )
+    # Buffered and sent in batches; flushed when the task finishes
+    get_notifier().notify(group_name, event_type, data)
+
+
+def delta_batcher(group_name, event_type):
+    """
+    Streams completion text to the lecture group as batched <kind>_delta events.
+    """
+    return DeltaBatcher(lambda text, seq: notify_ws(group_name, event_type, {"delta": text, "seq": seq}))
+
+@shared_task
+def normalize_audio(lecture_id, workflow_id=None):
+    """
+    Re-encodes the uploaded recording to 16 kHz mono Opus and stores it next
+    to the original so transcription uploads a much smaller file.
+    Failures are logged and transcription falls back to the original upload.
+    """
+    lecture = AudioLecture.objects.filter(id=lecture_id).first()
+    if not lecture:
+        logger.warning(f"No lecture found for ID: {lecture_id}")
+        return None
+    if lecture.normalized_audio_file or (workflow_id and stage_completed(lecture, "normalize")):
+        return STAGE_SKIPPED
+    if result_cache.contains("transcript", ensure_audio_hash(lecture), settings.TRANSCRIPTION_MODEL):
+        # transcribe_audio will be served from the cache, nothing to upload
+        return STAGE_SKIPPED
+
+    base, _ = os.path.splitext(os.path.basename(lecture.audio_file.name))
+    with local_copy(lecture.audio_file) as src_path, tempfile.TemporaryDirectory() as tmp_dir:
+        dst_path = os.path.join(tmp_dir, f"{base}.16k.ogg")
+        started = time.monotonic()
+        try:
+            normalize_audio_file(src_path, dst_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.error(f"Audio normalization failed for lecture {lecture_id}: {e}")
+            return None
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+
+        original_bytes = os.path.getsize(src_path)
+        normalized_bytes = os.path.getsize(dst_path)
+        save_file(lecture.normalized_audio_file, os.path.basename(dst_path), dst_path)
+    lecture.save(update_fields=["normalized_audio_file"])
+
+    report = {
+        "original_bytes": original_bytes,
+        "normalized_bytes": normalized_bytes,
+        "bytes_saved": original_bytes - normalized_bytes,
+        "processing_ms": elapsed_ms,
+    }
+    logger.info(f"Normalized audio for lecture {lecture_id}: {report}")
+    notify_ws(f"lecture_{lecture_id}", "status_update", {"status": "Audio optimized", **report})
+    return report
+
 
 @shared_task(bind=True)
-def transcribe_audio(self, lecture_id):
+def transcribe_audio(self, lecture_id, workflow_id=None):
     try:
         lecture = AudioLecture.objects.get(id=lecture_id)
         group_name = f"lecture_{lecture_id}"
 
-        lecture.status = "In progress"
-        lecture.save()
+        if workflow_id and stage_completed(lecture, "transcribe", workflow_id):
+            return STAGE_SKIPPED
+
+        lecture.set_status(LectureStatus.IN_PROGRESS)
         notify_ws(group_name, "status_update", {"status": "In progress"})
 
-        with open(lecture.audio_file.path, "rb") as f:
-            response = requests.post(
-                "https://api.groq.com/openai/v1/audio/transcriptions",
-                headers={"Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"},
-                files={"file": f},
-                data={"model": "whisper-large-v3-turbo"},
-            )
-            response.raise_for_status()
-            data = response.json()
-            transcript = data.get("text")
+        def report_progress(done, total):
+            notify_ws(group_name, "status_update", {
+                "status": "In progress",
+                "progress": f"chunk {done}/{total}",
+            })
 
+        audio_hash = ensure_audio_hash(lecture)
+        transcript = result_cache.get("transcript", audio_hash, settings.TRANSCRIPTION_MODEL)
+        if transcript is None:
+            audio = lecture.normalized_audio_file or lecture.audio_file
+            with local_copy(audio) as audio_path:
+                transcript, segments = transcribe_lecture_audio(audio_path, on_progress=report_progress)
             if not transcript:
-                raise ValueError("No 'text' found in response")
-
-            lecture.transcript = transcript
-            lecture.status = "Successful"
-            lecture.save()
+                raise ValueError("Transcription returned no text")
+            result_cache.put("transcript", transcript, audio_hash, settings.TRANSCRIPTION_MODEL)
+            result_cache.put("segments", json.dumps(segments), audio_hash, settings.TRANSCRIPTION_MODEL)
+        else:
+            # Transcripts cached before segments were stored come back untimed
+            segments = json.loads(result_cache.get("segments", audio_hash, settings.TRANSCRIPTION_MODEL) or "[]")
+            logger.info(f"Transcript for lecture {lecture_id} served from cache")
+
+        lecture.save_artifact(ArtifactKind.TRANSCRIPT, transcript)
+        TranscriptSegment.replace_for(lecture, segments)
+        lecture.set_status(LectureStatus.SUCCESSFUL)
+        passages = search.segment_passages(segments) if segments else None
+        search.safe_index_artifact(lecture, ArtifactKind.TRANSCRIPT, transcript, passages)
 
-            notify_ws(group_name, "status_update", {
-                "status": "Successful",
-                "transcript": transcript
-            })
+        notify_ws(group_name, "status_update", {
+            "status": "Successful",
+            "transcript": transcript
+        })
 
-            logger.info(f"Transcription successful for lecture {lecture_id}")
+        logger.info(f"Transcription successful for lecture {lecture_id}")
 
     except AudioLecture.DoesNotExist:
         logger.error(f"Lecture with id {lecture_id} does not exist.")
+    except RateLimited as e:
+        raise reschedule_throttled(self, e, f"lecture_{lecture_id}")
     except Exception as e:
         logger.error(f"Error transcribing audio for lecture {lecture_id}: {str(e)}")
         if "lecture" in locals():
-            lecture.status = "Failed"
-            lecture.save()
+            lecture.set_status(LectureStatus.FAILED)
             notify_ws(f"lecture_{lecture_id}", "status_update", {"status": "Failed"})
-        raise self.retry(exc=e, countdown=10, max_retries=3)
+        # Back off exponentially with jitter so retries don't arrive in lockstep
+        countdown = 10 * 2 ** self.request.retries + random.uniform(0, 5)
+        raise self.retry(exc=e, countdown=countdown, max_retries=3)
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=30)
-def summarize_transcript(self, lecture_id):
+def summarize_transcript(self, lecture_id, workflow_id=None):
     """
     Summarizes a lecture transcript using the Groq API.
     Automatically retries up to 3 times if network/API errors occur.
@@ -83,59 +197,66 @@ def summarize_transcript(self, lecture_id):
             logger.warning(f"No lecture found for ID: {lecture_id}")
             return
 
+        if workflow_id and stage_completed(lecture, "summarize", workflow_id):
+            return STAGE_SKIPPED
+
         if not lecture.transcript:
             msg = "Sorry, there is no transcript for this lecture."
             logger.warning(msg)
-            lecture.summary = msg
-            lecture.save()
+            lecture.save_artifact(ArtifactKind.SUMMARY, msg)
             return
 
         group_name = f"lecture_{lecture_id}"
         notify_ws(group_name, "status_update", {"status": "Summarizing"})
 
-        # ✅ Make API call
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"},
-            json={
-                "model": "llama-3.3-70b-versatile",
-                "messages": [
-                    {"role": "user", "content": f"Summarize this: {lecture.transcript}"}
-                ],
-            },
-            timeout=60
-        )
-
-        data = response.json()
-        logger.info("======================================================================")
-        logger.info(data)
-
-        # ✅ Handle non-200 or invalid responses
-        if response.status_code != 200 or "choices" not in data:
-            error_message = data.get("error", {}).get("message", "Sorry, data not available")
-            lecture.summary = error_message
-            lecture.save()
+        cache_parts = (result_cache.text_sha256(lecture.transcript), cache_signature(), settings.LLM_MODEL)
+        summary_text = result_cache.get("summary", *cache_parts)
+        if summary_text is not None:
+            lecture.save_artifact(ArtifactKind.SUMMARY, summary_text)
+            search.safe_index_artifact(lecture, ArtifactKind.SUMMARY, summary_text)
+            notify_ws(group_name, "status_update", {"status": "Summary ready", "summary": summary_text})
+            logger.info(f"Summary for lecture {lecture_id} served from cache")
+            return
+
+        def push_partial(index, total, partial):
+            notify_ws(group_name, "summary_partial", {
+                "chunk": index,
+                "chunks": total,
+                "summary": partial,
+            })
+
+        # ✅ Map-reduce over the transcript; short transcripts take a single call
+        stream = delta_batcher(group_name, "summary_delta")
+        try:
+            summary_text = summarize_text(lecture.transcript, on_partial=push_partial, stream=stream)
+        except LLMResponseError as e:
+            # ✅ Handle non-200 or invalid responses
+            error_message = str(e)
+            lecture.save_artifact(ArtifactKind.SUMMARY, error_message)
             notify_ws(group_name, "status_update", {"status": "Failed", "summary": error_message})
             logger.error(f"Groq API Error: {error_message}")
             return
 
-        # ✅ Extract summary text
-        summary_text = data["choices"][0]["message"]["content"].strip()
-        lecture.summary = summary_text
-        lecture.save()
+        stream_stats = stream.close()
+        result_cache.put("summary", summary_text, *cache_parts)
+        lecture.save_artifact(ArtifactKind.SUMMARY, summary_text)
+        search.safe_index_artifact(lecture, ArtifactKind.SUMMARY, summary_text)
 
         notify_ws(group_name, "status_update", {"status": "Summary ready", "summary": summary_text})
-        logger.info(f"Successfully summarized lecture ID {lecture_id}")
+        logger.info(f"Successfully summarized lecture ID {lecture_id}; stream {stream_stats}")
+        return {"status": "success", "stream": stream_stats}
+
+    except RateLimited as e:
+        raise reschedule_throttled(self, e, f"lecture_{lecture_id}")
 
     except requests.exceptions.RequestException as e:
         # ✅ Retry on network issues (up to 3 times)
         msg = f"Network error occurred: {str(e)}. Retrying..."
         logger.error(msg)
         if self.request.retries < self.max_retries:
-            raise self.retry(exc=e)
+            raise self.retry(exc=e, countdown=30 * 2 ** self.request.retries + random.uniform(0, 5))
         if lecture:
-            lecture.summary = "Network error: please try again later."
-            lecture.save()
+            lecture.save_artifact(ArtifactKind.SUMMARY, "Network error: please try again later.")
         if 'group_name' in locals():
             notify_ws(group_name, "status_update", {"status": "Failed", "summary": msg})
 
@@ -143,70 +264,56 @@ def summarize_transcript(self, lecture_id):
         msg = f"Unexpected error occurred: {str(e)}"
         logger.error(msg)
         if lecture:
-            lecture.summary = msg
-            lecture.save()
+            lecture.save_artifact(ArtifactKind.SUMMARY, msg)
         if 'group_name' in locals():
             notify_ws(group_name, "status_update", {"status": "Failed", "summary": msg})
            
 
 
 @shared_task(bind=True, max_retries=3)
-def export_summary_to_pdf(self, lecture_id):
+def export_summary_to_pdf(self, lecture_id, workflow_id=None, sections=None):
     try:
         lecture = AudioLecture.objects.get(id=lecture_id)
         group_name = f"lecture_{lecture_id}"
-
-        notify_ws(group_name, "status_update", {"status": "Exporting PDF"})
-        
-        # Add progress tracking
-        notify_ws(group_name, "status_update", {"status": "Creating PDF layout"})
-        
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        
-        notify_ws(group_name, "status_update", {"status": "Adding content to PDF"})
-        
-        # Split long content into chunks to avoid memory issues
-        title = lecture.title[:100]  # Limit title length
-        summary = lecture.summary or "No summary available"
-        
-        # Add title
-        pdf.set_font("Arial", 'B', 16)
-        pdf.cell(0, 10, title, ln=True, align='C')
-        pdf.ln(10)
-        
-        # Add summary with better formatting
-        pdf.set_font("Arial", size=12)
-        summary_lines = summary.split('\n')
-        for line in summary_lines:
-            if line.strip():
-                pdf.multi_cell(0, 8, line.strip())
-        
-        notify_ws(group_name, "status_update", {"status": "Saving PDF file"})
-        
-        # Ensure directory exists
-        path = os.path.join(settings.MEDIA_ROOT, f"summaries/lecture_{lecture_id}_summary.pdf")
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        
-        # Save PDF with error handling
-        try:
-            pdf.output(path)
-        except Exception as pdf_error:
-            logger.error(f"PDF generation error: {pdf_error}")
-            raise self.retry(exc=pdf_error, countdown=5)
-        
-        # Update lecture with PDF file
-        lecture.pdf_file.name = f"summaries/lecture_{lecture_id}_summary.pdf"
-        lecture.save()
-        
+        sections = pdf_sections(sections)
+
+        if workflow_id and stage_completed(lecture, "pdf", workflow_id):
+            return STAGE_SKIPPED
+
+        # PDFs are stored under a hash of their content, so an unchanged
+        # lecture (or an identical one) reuses the file rendered before
+        name = pdf_name(lecture, sections)
+        cached = lecture.pdf_file.name == name or default_storage.exists(name)
+        if not cached:
+            notify_ws(group_name, "status_update", {"status": "Exporting PDF"})
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "lecture.pdf")
+                with metrics.timed(metrics.PDF_RENDER_SECONDS):
+                    pages = render_lecture_pdf(
+                        lecture, sections, path,
+                        on_progress=lambda section: notify_ws(
+                            group_name, "status_update", {"status": f"Adding {section} to PDF"}
+                        ),
+                    )
+                notify_ws(group_name, "status_update", {"status": "Saving PDF file"})
+                with open(path, "rb") as f:
+                    name = default_storage.save(name, File(f))
+            logger.info(f"Rendered {pages}-page PDF for lecture {lecture_id} ({', '.join(sections)})")
+
+        if lecture.pdf_file.name != name:
+            # The old file is not deleted: other lectures may share it
+            lecture.pdf_file.name = name
+            lecture.save(update_fields=["pdf_file"])
+
+        metrics.PDF_EXPORTS.labels("cached" if cached else "rendered").inc()
         notify_ws(group_name, "status_update", {
             "status": "PDF ready", 
-            "pdf": lecture.pdf_file.url,
+            "pdf": media_url(lecture.pdf_file),
+            "cached": cached,
             "message": "PDF generated successfully!"
         })
         
-        logger.info(f"PDF generated successfully for lecture {lecture_id}")
+        logger.info(f"PDF ready for lecture {lecture_id} (cached={cached})")
         
     except AudioLecture.DoesNotExist:
         logger.error(f"Lecture with id {lecture_id} does not exist.")
@@ -217,44 +324,161 @@ def export_summary_to_pdf(self, lecture_id):
         
     except Exception as e:
         logger.error(f"Error generating PDF for lecture {lecture_id}: {str(e)}")
+        metrics.PDF_EXPORTS.labels("failed").inc()
         notify_ws(f"lecture_{lecture_id}", "status_update", {
             "status": "Error", 
             "message": f"PDF generation failed: {str(e)}"
         })
-        if self.request.retries < self.max_retries:
+        # Rendering the same input fails the same way; only storage errors are worth retrying
+        if isinstance(e, OSError) and self.request.retries < self.max_retries:
             raise self.retry(exc=e, countdown=10)
 
 
-@shared_task
-def generate_flashcards(lecture_id):
+@shared_task(bind=True)
+def generate_flashcards(self, lecture_id, workflow_id=None):
     print('I have started generating')
     lecture = AudioLecture.objects.get(id=lecture_id)
     group_name = f"lecture_{lecture_id}"
 
+    if workflow_id and stage_completed(lecture, "flashcards", workflow_id):
+        return STAGE_SKIPPED
+
     notify_ws(group_name, "status_update", {"status": "Generating flashcards"})
 
-    response = requests.post(
-        "https://api.groq.com/openai/v1/chat/completions",
-        headers={"Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"},
-        json={
-            "model": "llama-3.3-70b-versatile",
-            "messages": [
-                {"role": "user", "content": f"Generate 10 flashcards from this summary:\n\n{lecture.transcript}"}
-            ],
-        },
+    prompt, source, truncated = prompts.flashcards_prompt(lecture, stage_completed(lecture, "summarize"))
+    cache_parts = (result_cache.text_sha256(prompt), settings.LLM_MODEL)
+    raw = result_cache.get("flashcards", *cache_parts)
+    stream_stats = None
+    if raw is None:
+        tokens = prompts.record("flashcards", prompt, truncated)
+        logger.info(f"Flashcards for lecture {lecture_id} from its {source}: {tokens} prompt tokens"
+                    f"{' (truncated)' if truncated else ''}")
+        stream = delta_batcher(group_name, "flashcards_delta")
+        try:
+            stream.begin()
+            response = get_client().chat(
+                [{"role": "user", "content": prompt}],
+                settings.LLM_MODEL,
+                stream=True,
+            )
+        except RateLimited as e:
+            raise reschedule_throttled(self, e, group_name)
+
+        if response.status_code != 200:
+            message = error_message(response)
+            notify_ws(group_name, "status_update", {"status": "Error", "message": message})
+            return {"status": "error", "message": message}
+
+        parts = []
+        for delta in iter_deltas(response):
+            parts.append(delta)
+            stream.add(delta)
+        stream_stats = stream.close()
+        raw = "".join(parts)
+
+    try:
+        cards = parse_flashcards(raw)
+    except FlashcardFormatError as e:
+        logger.error(f"Flashcards for lecture {lecture_id} rejected: {e}")
+        notify_ws(group_name, "status_update", {"status": "Error", "message": str(e)})
+        return {"status": "error", "message": str(e)}
+
+    if stream_stats is not None:
+        result_cache.put("flashcards", raw, *cache_parts)
+    flashcards_text = as_text(cards)
+    lecture.save_artifact(ArtifactKind.FLASHCARDS, flashcards_text)
+    segments = list(lecture.segments.values_list("start_ms", "text"))
+    Flashcard.replace_for(lecture, [(q, a, locate(source, segments)) for q, a, source in cards])
+    logger.info(f"{len(cards)} flashcards for lecture {lecture_id} saved; stream {stream_stats}")
+
+    notify_ws(group_name, "status_update", {
+        "status": "Flashcards ready", "flashcards": flashcards_text, "count": len(cards),
+    })
+
+    result = {"status": "success", "flashcards": flashcards_text, "count": len(cards)}
+    if stream_stats is None:
+        result["cached"] = True
+    else:
+        result["stream"] = stream_stats
+    return result
+
+
+@shared_task
+def finalize_upload(session_id):
+    """
+    Assembles a completed resumable upload into the media store, hashing it
+    on the way, and creates the lecture.
+    """
+    session = UploadSession.objects.filter(id=session_id, status="finalizing").first()
+    if not session:
+        return None
+    store = get_part_store()
+    digest = hashlib.sha256()
+    try:
+        with tempfile.TemporaryFile() as f:
+            for block in store.iter_content(session):
+                digest.update(block)
+                f.write(block)
+            audio_sha256 = digest.hexdigest()
+            if session.expected_sha256 and session.expected_sha256 != audio_sha256:
+                raise ValueError(f"SHA-256 mismatch: expected {session.expected_sha256}, got {audio_sha256}")
+            f.seek(0)
+            name = default_storage.save(f"lectures/{session.filename}", File(f, name=session.filename))
+    except Exception as e:
+        logger.error(f"Finalizing upload {session_id} failed: {e}")
+        UploadSession.objects.filter(id=session_id).update(status="failed", error=str(e))
+        return None
+
+    lecture = AudioLecture.objects.create(
+        user=session.user, title=session.title, audio_file=name, audio_sha256=audio_sha256,
+    )
+    UploadSession.objects.filter(id=session_id).update(
+        status="complete", lecture=lecture, completed_at=timezone.now(),
     )
+    session.status = "complete"
+    store.discard(session)
+    metrics.UPLOAD_BYTES.labels("resumable").inc(session.size)
+    logger.info(f"Upload {session_id} finalized as lecture {lecture.id} ({session.size} bytes)")
+    return lecture.id
 
-    data = response.json()
-    print('the data',data)
-    if "error" in data:
-        notify_ws(group_name, "status_update", {"status": "Error", "message": data["error"]["message"]})
-        return {"status": "error", "message": data["error"]["message"]}
 
-    flashcards_text = data["choices"][0]["message"]["content"]
-    lecture.flashcards = flashcards_text
-    print(f'Flashcards for lecture {lecture_id}  {flashcards_text}')
-    lecture.save()
+@shared_task
+def complete_workflow(workflow_id):
+    return finish_workflow(workflow_id)
+
 
-    notify_ws(group_name, "status_update", {"status": "Flashcards ready", "flashcards": flashcards_text})
+@shared_task(bind=True)
+def plan_text_stages(self, lecture_id, workflow_id=None):
+    """
+    Runs a workflow's summary and flashcards stages. A transcript within
+    FLASHCARDS_INPUT_TOKENS is small enough to make cards from, so both run
+    in parallel; a longer one is summarized first and the cards are made
+    from the much smaller summary instead of a truncated transcript.
+    """
+    lecture = AudioLecture.objects.filter(id=lecture_id).first()
+    summarize = summarize_transcript.si(lecture_id, workflow_id=workflow_id).set(priority=PRIORITY_BATCH)
+    flashcards = generate_flashcards.si(lecture_id, workflow_id=workflow_id).set(priority=PRIORITY_BATCH)
+    if lecture and estimate_tokens(lecture.transcript or "") > settings.FLASHCARDS_INPUT_TOKENS:
+        return self.replace(chain(summarize, flashcards))
+    return self.replace(group(summarize, flashcards))
 
-    return {"status": "success", "flashcards": flashcards_text}
+
+def start_lecture_workflow(lecture):
+    """
+    Runs the whole pipeline as one canvas: normalize and transcribe, then
+    summary and flashcards (see plan_text_stages), then the PDF. Stages
+    whose output already exists are skipped, so re-running a workflow is
+    cheap.
+    """
+    workflow = create_workflow(lecture)
+    wid = str(workflow.id)
+    # Priority is set per signature; chain options only reach the first task
+    canvas = chain(
+        normalize_audio.si(lecture.id, workflow_id=wid).set(priority=PRIORITY_BATCH),
+        transcribe_audio.si(lecture.id, workflow_id=wid).set(priority=PRIORITY_BATCH),
+        plan_text_stages.si(lecture.id, workflow_id=wid).set(priority=PRIORITY_BATCH),
+        export_summary_to_pdf.si(lecture.id, workflow_id=wid).set(priority=PRIORITY_BATCH),
+        complete_workflow.si(wid).set(priority=PRIORITY_BATCH),
+    )
+    canvas.apply_async(link_error=complete_workflow.si(wid))
+    return workflow
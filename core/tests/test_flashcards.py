@@ -0,0 +1,93 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from core.flashcards import FlashcardFormatError, locate, parse_flashcards, review
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+
+def card(**fields):
+    defaults = dict(ease_factor=2.5, interval_days=0, repetitions=0, lapses=0,
+                    due_at=None, last_reviewed_at=None)
+    return SimpleNamespace(**{**defaults, **fields})
+
+
+class ParseFlashcardsTests(unittest.TestCase):
+
+    def test_object_reply(self):
+        reply = json.dumps({"flashcards": [{"question": "Q1", "answer": "A1", "source": "S1"}]})
+        self.assertEqual(parse_flashcards(reply), [("Q1", "A1", "S1")])
+
+    def test_fenced_bare_list(self):
+        reply = '```json\n[{"question": " Q ", "answer": " A "}]\n```'
+        self.assertEqual(parse_flashcards(reply), [("Q", "A", "")])
+
+    def test_missing_source_is_empty(self):
+        reply = json.dumps({"flashcards": [{"question": "Q", "answer": "A", "source": None}]})
+        self.assertEqual(parse_flashcards(reply)[0][2], "")
+
+    def test_rejects_invalid_replies(self):
+        for reply in ["not json", "[]", '{"flashcards": "x"}', '[1]', '[{"question": "Q"}]']:
+            with self.subTest(reply=reply), self.assertRaises(FlashcardFormatError):
+                parse_flashcards(reply)
+
+
+class LocateTests(unittest.TestCase):
+    SEGMENTS = [
+        (0, "Cells are the basic unit of life."),
+        (5000, "Mitochondria produce most of the energy in a cell."),
+        (10000, "Ribosomes build proteins from amino acids"),
+        (15000, "which are read off messenger RNA."),
+    ]
+
+    def test_quote_within_one_segment(self):
+        self.assertEqual(locate("mitochondria produce most of the energy", self.SEGMENTS), 5000)
+
+    def test_quote_spanning_two_segments(self):
+        self.assertEqual(locate("build proteins from amino acids which are read off messenger", self.SEGMENTS), 10000)
+
+    def test_no_match(self):
+        self.assertIsNone(locate("photosynthesis in chloroplasts of green plants", self.SEGMENTS))
+
+    def test_empty_source_or_segments(self):
+        self.assertIsNone(locate("", self.SEGMENTS))
+        self.assertIsNone(locate("cells are the basic unit", []))
+
+
+class ReviewTests(unittest.TestCase):
+
+    def test_first_passes_use_fixed_intervals(self):
+        c = card()
+        review(c, 5, NOW)
+        self.assertEqual((c.repetitions, c.interval_days), (1, 1))
+        review(c, 5, NOW)
+        self.assertEqual((c.repetitions, c.interval_days), (2, 6))
+
+    def test_later_pass_multiplies_by_ease(self):
+        c = card(repetitions=2, interval_days=6)
+        review(c, 3, NOW)
+        self.assertEqual(c.interval_days, 15)  # 6 * 2.5, ease updated afterwards
+        self.assertAlmostEqual(c.ease_factor, 2.36)
+        self.assertEqual(c.due_at, NOW + timedelta(days=15))
+        self.assertEqual(c.last_reviewed_at, NOW)
+
+    def test_perfect_grade_raises_ease(self):
+        c = card()
+        review(c, 5, NOW)
+        self.assertAlmostEqual(c.ease_factor, 2.6)
+
+    def test_failing_grade_restarts_card(self):
+        c = card(repetitions=4, interval_days=30)
+        review(c, 2, NOW)
+        self.assertEqual((c.repetitions, c.interval_days, c.lapses), (0, 1, 1))
+        self.assertAlmostEqual(c.ease_factor, 2.18)
+        self.assertEqual(c.due_at, NOW + timedelta(days=1))
+
+    def test_ease_never_drops_below_floor(self):
+        c = card(ease_factor=1.5)
+        review(c, 0, NOW)
+        self.assertEqual(c.ease_factor, 1.3)
+        review(c, 0, NOW)
+        self.assertEqual((c.ease_factor, c.lapses), (1.3, 2))
@@ -0,0 +1,24 @@
+import unittest
+
+from core.transcription import stitch_transcripts
+
+
+class StitchTranscriptsTests(unittest.TestCase):
+
+    def test_drops_repeated_overlap(self):
+        texts = ["the cell membrane controls what enters", "controls what enters and leaves the cell"]
+        self.assertEqual(stitch_transcripts(texts), "the cell membrane controls what enters and leaves the cell")
+
+    def test_overlap_ignores_case_and_punctuation(self):
+        texts = ["energy comes from ATP, which cells", "From atp which cells make constantly."]
+        self.assertEqual(stitch_transcripts(texts), "energy comes From atp which cells make constantly.")
+
+    def test_short_match_is_not_an_overlap(self):
+        # Two shared words are below MIN_OVERLAP_MATCH_WORDS, so both are kept
+        texts = ["first part of it", "of it second part"]
+        self.assertEqual(stitch_transcripts(texts), "first part of it of it second part")
+
+    def test_single_and_empty_inputs(self):
+        self.assertEqual(stitch_transcripts(["only one chunk"]), "only one chunk")
+        self.assertEqual(stitch_transcripts([]), "")
+        self.assertEqual(stitch_transcripts(["", "after an empty chunk"]), "after an empty chunk")
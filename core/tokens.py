@@ -0,0 +1,76 @@
+import logging
+import re
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Chat formatting adds a few tokens around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Used when no tokenizer is available: roughly four characters per token for English text
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+
+
+def get_encoding():
+    """
+    Returns the tiktoken encoding named by TOKENIZER_ENCODING, or None when
+    tiktoken is not installed or the encoding cannot be loaded (it is
+    downloaded on first use unless it is in TIKTOKEN_CACHE_DIR).
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(settings.TOKENIZER_ENCODING)
+        except Exception as e:
+            logger.warning(f"Tokenizer unavailable ({e}); estimating tokens from length")
+    return _encoding
+
+
+def tokenizer_name():
+    """
+    Names what estimate_tokens counts with; chunking depends on it.
+    """
+    return settings.TOKENIZER_ENCODING if get_encoding() is not None else "chars"
+
+
+def estimate_tokens(text):
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def estimate_message_tokens(messages):
+    return sum(estimate_tokens(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Returns text cut to at most max_tokens, ending on a word boundary.
+    """
+    encoding = get_encoding()
+    if encoding is None:
+        limit = max(0, (max_tokens - 1) * CHARS_PER_TOKEN)
+        if len(text) <= limit:
+            return text
+        cut = text[:limit]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        cut = encoding.decode(tokens[:max_tokens])
+    return cut.rsplit(None, 1)[0] if re.search(r"\s", cut) else cut
+
+
+def compact_whitespace(text):
+    """
+    Collapses runs of spaces and blank lines, which cost tokens but carry
+    nothing for the model. Paragraph breaks are kept.
+    """
+    text = re.sub(r"[ \t]+", " ", text)
+    return re.sub(r"\s*\n\s*\n\s*", "\n\n", text).strip()
@@ -0,0 +1,169 @@
+import difflib
+import logging
+import re
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from .audio import split_audio
+from .llm_client import get_client
+from .ratelimit import RateLimited
+
+logger = logging.getLogger(__name__)
+
+# How many words at each chunk boundary are compared when removing overlap.
+OVERLAP_SEARCH_WORDS = 80
+# Shorter matches are treated as coincidence rather than repeated audio.
+MIN_OVERLAP_MATCH_WORDS = 3
+
+# A timed piece of the transcript; offsets are milliseconds from the start
+# of the recording.
+Segment = namedtuple("Segment", ["start_ms", "end_ms", "text"])
+ChunkTranscript = namedtuple("ChunkTranscript", ["text", "segments"])
+
+
+class ChunkTranscriptionError(Exception):
+    def __init__(self, failed, errors):
+        self.failed = failed
+        self.errors = errors
+        super().__init__(f"Chunks {failed} failed to transcribe: {errors[-1]}")
+
+
+def transcribe_file(client, path, model, offset=0.0):
+    """
+    Sends a single audio file to the OpenAI-compatible transcription endpoint
+    and returns its text and timed segments, shifted by offset seconds.
+    """
+    response = client.transcribe(
+        path, model, timeout=settings.TRANSCRIBE_REQUEST_TIMEOUT, response_format="verbose_json"
+    )
+    response.raise_for_status()
+    data = response.json()
+    text = data.get("text")
+    if text is None:
+        raise ValueError("No 'text' found in response")
+    segments = [
+        Segment(
+            int((offset + segment["start"]) * 1000),
+            int((offset + segment["end"]) * 1000),
+            segment["text"].strip(),
+        )
+        for segment in data.get("segments") or []
+        if segment.get("text", "").strip()
+    ]
+    return ChunkTranscript(text.strip(), segments)
+
+
+def transcribe_chunks(chunks, transcribe, max_workers, max_attempts, on_progress=None):
+    """
+    Transcribes chunks concurrently. Only chunks that failed are resubmitted
+    on the next attempt. Returns the results in chunk order.
+    """
+    results = {}
+    errors = []
+    pending = list(chunks)
+
+    for attempt in range(1, max_attempts + 1):
+        failed = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(transcribe, chunk): chunk for chunk in pending}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    results[chunk.index] = future.result()
+                except RateLimited:
+                    # Let the task reschedule itself rather than burn attempts
+                    raise
+                except Exception as e:
+                    logger.warning(f"Chunk {chunk.index} failed on attempt {attempt}: {e}")
+                    errors.append(e)
+                    failed.append(chunk)
+                    continue
+                if on_progress:
+                    on_progress(len(results), len(chunks))
+
+        if not failed:
+            break
+        pending = failed
+        if attempt < max_attempts:
+            time.sleep(2 ** attempt)
+    else:
+        raise ChunkTranscriptionError([c.index for c in pending], errors)
+
+    return [results[chunk.index] for chunk in chunks]
+
+
+def _normalize(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def stitch_transcripts(texts):
+    """
+    Joins chunk transcripts, dropping the words repeated in the overlapping
+    window between neighbouring chunks.
+    """
+    words = []
+    for text in texts:
+        incoming = text.split()
+        if not words:
+            words = incoming
+            continue
+
+        tail = words[-OVERLAP_SEARCH_WORDS:]
+        head = incoming[:OVERLAP_SEARCH_WORDS]
+        matcher = difflib.SequenceMatcher(
+            None, [_normalize(w) for w in tail], [_normalize(w) for w in head], autojunk=False
+        )
+        match = matcher.find_longest_match(0, len(tail), 0, len(head))
+
+        if match.size >= MIN_OVERLAP_MATCH_WORDS:
+            cut = len(words) - len(tail) + match.a
+            words = words[:cut] + incoming[match.b:]
+        else:
+            words.extend(incoming)
+
+    return " ".join(words)
+
+
+def stitch_segments(chunks, segment_lists):
+    """
+    Merges per-chunk segments into one timeline. Where neighbouring chunks
+    overlap, each keeps the segments that start in its half of the overlap,
+    so repeated speech appears once.
+    """
+    merged = []
+    for i, (chunk, segments) in enumerate(zip(chunks, segment_lists)):
+        lower = (chunk.start + chunks[i - 1].end) / 2 if i > 0 else float("-inf")
+        upper = (chunks[i + 1].start + chunk.end) / 2 if i + 1 < len(chunks) else float("inf")
+        for segment in segments:
+            if lower <= segment.start_ms / 1000 < upper:
+                merged.append(segment)
+    return merged
+
+
+def transcribe_lecture_audio(path, on_progress=None):
+    """
+    Splits a recording into overlapping windows, transcribes them in parallel
+    and returns the stitched transcript text and its timed segments.
+    """
+    model = settings.TRANSCRIPTION_MODEL
+    client = get_client()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        chunks = split_audio(
+            path,
+            tmp_dir,
+            settings.TRANSCRIBE_CHUNK_SECONDS,
+            settings.TRANSCRIBE_CHUNK_OVERLAP_SECONDS,
+        )
+        results = transcribe_chunks(
+            chunks,
+            lambda chunk: transcribe_file(client, chunk.path, model, offset=chunk.start),
+            max_workers=settings.TRANSCRIBE_MAX_WORKERS,
+            max_attempts=settings.TRANSCRIBE_CHUNK_ATTEMPTS,
+            on_progress=on_progress,
+        )
+    text = stitch_transcripts([r.text for r in results])
+    return text, stitch_segments(chunks, [r.segments for r in results])
@@ -0,0 +1,188 @@
+import hashlib
+import logging
+import os
+import shutil
+
+from django.conf import settings
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+class PartTooLarge(UploadError):
+    pass
+
+
+class LocalPartStore:
+    """
+    Keeps parts as files under MEDIA_ROOT/uploads/<session>/. Parts are PUT
+    to this app, so it suits development and deployments without S3.
+    """
+
+    def _dir(self, session):
+        return os.path.join(settings.MEDIA_ROOT, "uploads", str(session.id))
+
+    def _path(self, session, number):
+        return os.path.join(self._dir(session), f"{number:05d}.part")
+
+    def start(self, session):
+        os.makedirs(self._dir(session), exist_ok=True)
+        return ""
+
+    def part_url(self, session, number, request):
+        return request.build_absolute_uri(
+            reverse("upload-part", kwargs={"pk": session.id, "number": number})
+        )
+
+    def write_part(self, session, number, stream):
+        """
+        Streams one part to disk and returns its MD5 as the ETag. Written to
+        a temporary name first so a dropped connection never leaves a short
+        part that looks complete. Reads at most one byte more than the part
+        should hold and raises PartTooLarge if that byte arrives.
+        """
+        path = self._path(session, number)
+        remaining = part_length(session, number) + 1
+        md5 = hashlib.md5()
+        with open(path + ".tmp", "wb") as f:
+            while remaining > 0:
+                block = stream.read(min(COPY_CHUNK_BYTES, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                md5.update(block)
+                f.write(block)
+        if remaining == 0:
+            os.remove(path + ".tmp")
+            raise PartTooLarge(f"Part {number} is larger than {part_length(session, number)} bytes")
+        os.replace(path + ".tmp", path)
+        return md5.hexdigest()
+
+    def received_parts(self, session):
+        parts = {}
+        for name in os.listdir(self._dir(session)) if os.path.isdir(self._dir(session)) else []:
+            if name.endswith(".part"):
+                parts[int(name[:-5])] = os.path.getsize(os.path.join(self._dir(session), name))
+        return parts
+
+    def complete(self, session):
+        pass
+
+    def iter_content(self, session):
+        for number in range(1, session.part_count + 1):
+            with open(self._path(session, number), "rb") as f:
+                yield from iter(lambda: f.read(COPY_CHUNK_BYTES), b"")
+
+    def discard(self, session):
+        shutil.rmtree(self._dir(session), ignore_errors=True)
+
+
+class S3PartStore:
+    """
+    S3 multipart upload: clients PUT parts to presigned URLs, so the bytes
+    never pass through the web process. AWS_S3_ENDPOINT_URL points it at an
+    S3-compatible store such as MinIO.
+    """
+
+    def __init__(self):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = settings.AWS_STORAGE_BUCKET_NAME
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.AWS_S3_ENDPOINT_URL or None,
+            region_name=settings.AWS_REGION,
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY or None,
+            config=Config(signature_version="s3v4"),
+        )
+
+    def start(self, session):
+        response = self.client.create_multipart_upload(Bucket=self.bucket, Key=session.key)
+        return response["UploadId"]
+
+    def part_url(self, session, number, request):
+        return self.client.generate_presigned_url(
+            "upload_part",
+            Params={
+                "Bucket": self.bucket,
+                "Key": session.key,
+                "UploadId": session.backend_upload_id,
+                "PartNumber": number,
+            },
+            ExpiresIn=settings.UPLOAD_URL_EXPIRY,
+        )
+
+    def _list_parts(self, session):
+        parts = []
+        paginator = self.client.get_paginator("list_parts")
+        for page in paginator.paginate(
+            Bucket=self.bucket, Key=session.key, UploadId=session.backend_upload_id
+        ):
+            parts.extend(page.get("Parts", []))
+        return parts
+
+    def received_parts(self, session):
+        return {part["PartNumber"]: part["Size"] for part in self._list_parts(session)}
+
+    def complete(self, session):
+        from botocore.exceptions import ClientError
+
+        try:
+            parts = self._list_parts(session)
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=session.key,
+                UploadId=session.backend_upload_id,
+                MultipartUpload={
+                    "Parts": [{"PartNumber": p["PartNumber"], "ETag": p["ETag"]} for p in parts],
+                },
+            )
+        except ClientError as e:
+            raise UploadError(f"Could not complete the upload: {e}")
+
+    def iter_content(self, session):
+        body = self.client.get_object(Bucket=self.bucket, Key=session.key)["Body"]
+        yield from body.iter_chunks(COPY_CHUNK_BYTES)
+
+    def discard(self, session):
+        if session.status == "uploading":
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=session.key, UploadId=session.backend_upload_id
+            )
+        else:
+            self.client.delete_object(Bucket=self.bucket, Key=session.key)
+
+
+PART_STORES = {"local": LocalPartStore, "s3": S3PartStore}
+_store = None
+
+
+def get_part_store():
+    global _store
+    if _store is None:
+        _store = PART_STORES[settings.UPLOAD_BACKEND]()
+    return _store
+
+
+def part_length(session, number):
+    """
+    Every part but the last is exactly part_size bytes.
+    """
+    if number < session.part_count:
+        return session.part_size
+    return session.size - session.part_size * (number - 1)
+
+
+def missing_parts(session, received):
+    """
+    Part numbers not yet received in full.
+    """
+    return [n for n in range(1, session.part_count + 1) if received.get(n) != part_length(session, n)]
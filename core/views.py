@@ -1,12 +1,58 @@
-from rest_framework import viewsets,status,generics
+from rest_framework import viewsets,status,generics,mixins
 from rest_framework.decorators import action,api_view, permission_classes
 from rest_framework.response import Response
-from .models import AudioLecture,CustomUser
+from .models import AudioLecture,CustomUser,Flashcard,LectureWorkflow,LectureArtifact,ArtifactKind,LectureStatus,TranscriptSegment,UploadSession
 from rest_framework.permissions import IsAuthenticated
-from .serializers import AudioLectureSerializer,RegisterSerializer,EmptySerializer
-from .tasks import transcribe_audio, summarize_transcript, export_summary_to_pdf, generate_flashcards
-from rest_framework.permissions import AllowAny
-from rest_framework.parsers import MultiPartParser, FormParser
+from .serializers import AudioLectureSerializer,AudioLectureListSerializer,RegisterSerializer,EmptySerializer,LectureWorkflowSerializer,TranscriptSegmentSerializer,UploadSessionSerializer,FlashcardSerializer,ReviewBatchSerializer,requested_fields
+from .pagination import LectureCursorPagination
+from .tasks import normalize_audio, transcribe_audio, summarize_transcript, export_summary_to_pdf, generate_flashcards, finalize_upload, start_lecture_workflow, PRIORITY_INTERACTIVE
+from rest_framework.permissions import AllowAny, IsAdminUser
+from . import cache as result_cache
+from . import events
+from . import metrics
+from . import ratelimit
+from . import search as lecture_search
+from rest_framework.parsers import BaseParser, JSONParser, MultiPartParser, FormParser
+from .uploads import LocalPartStore, PartTooLarge, UploadError, get_part_store, missing_parts
+from .storage import unsign_media_name
+from .pdf import pdf_sections
+from .workflow import abandon_if_stale
+from . import flashcards as scheduler
+from django.utils import timezone
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from datetime import datetime, time as dt_time
+import hmac
+import os
+from celery import chain
+from django.db.models import Exists, OuterRef
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns the list view actually returns; the large text fields stay on disk.
+LIST_COLUMNS = ['id', 'title', 'status', 'audio_file', 'pdf_file', 'created_at']
+# Upper bound on segments returned by one range request.
+MAX_SEGMENTS = 500
+# Whisper never emits a segment longer than its 30 s window, which lets a
+# range lookup seek on (lecture, start_ms) instead of scanning from zero.
+MAX_SEGMENT_MS = 30000
+
+
+class RawPartParser(BaseParser):
+    """
+    Hands the request body stream to the view so upload parts are copied
+    to disk in blocks instead of being buffered.
+    """
+    media_type = '*/*'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream
+
+
+def has_artifact(kind):
+    return Exists(LectureArtifact.objects.filter(lecture=OuterRef('pk'), kind=kind))
 
 
 class AudioLectureViewSet(viewsets.ModelViewSet):
@@ -14,16 +60,101 @@ class AudioLectureViewSet(viewsets.ModelViewSet):
     serializer_class = AudioLectureSerializer
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]  # ✅ This enables file upload in Swagger
+    pagination_class = LectureCursorPagination
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return AudioLectureListSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return AudioLecture.objects.none()
+        queryset = AudioLecture.objects.filter(user=self.request.user)
+        if self.action != 'list':
+            return queryset
+
+        lecture_status = self.request.query_params.get('status')
+        if lecture_status:
+            # Accept the numeric code or its label ("In progress")
+            labels = {label.lower(): value for value, label in LectureStatus.choices}
+            code = labels.get(lecture_status.lower(), lecture_status)
+            queryset = queryset.filter(status=code) if str(code).isdigit() else queryset.none()
+
+        columns = LIST_COLUMNS
+        requested = requested_fields(self.request)
+        if requested:
+            # created_at is always needed for the pagination cursor
+            columns = [c for c in LIST_COLUMNS if c in requested or c in ('id', 'created_at')]
+        return queryset.only(*columns).annotate(
+            has_transcript=has_artifact(ArtifactKind.TRANSCRIPT),
+            has_summary=has_artifact(ArtifactKind.SUMMARY),
+            has_flashcards=has_artifact(ArtifactKind.FLASHCARDS),
+        )
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Full-text search over the user's transcripts and summaries: ?q=terms&limit=20
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        results = lecture_search.search(request.user, query, limit)
+        return Response({'query': query, 'count': len(results), 'results': results})
+
+    @action(detail=True, methods=['get'])
+    def segments(self, request, pk=None):
+        """
+        Transcript segments overlapping ?start_ms=&end_ms=; ?at_ms= returns the
+        segment being spoken at that offset.
+        """
+        lecture = self.get_object()
+        params = request.query_params
+        try:
+            if 'at_ms' in params:
+                start = end = int(params['at_ms'])
+            else:
+                start = int(params.get('start_ms', 0))
+                end = int(params['end_ms']) if 'end_ms' in params else None
+        except ValueError:
+            return Response({'error': 'Offsets must be integers (milliseconds)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        segments = TranscriptSegment.objects.filter(
+            lecture=lecture, start_ms__gte=max(start - MAX_SEGMENT_MS, 0), end_ms__gt=start
+        )
+        if end is not None:
+            segments = segments.filter(start_ms__lte=end)
+        segments = list(segments[:MAX_SEGMENTS + 1])
+        return Response({
+            'lecture_id': lecture.id,
+            'segments': TranscriptSegmentSerializer(segments[:MAX_SEGMENTS], many=True).data,
+            'truncated': len(segments) > MAX_SEGMENTS,
+        })
+
+    @action(detail=True, methods=['get'])
+    def cards(self, request, pk=None):
+        lecture = self.get_object()
+        cards = Flashcard.objects.filter(lecture=lecture).select_related('lecture')
+        return Response({'lecture_id': lecture.id, 'cards': FlashcardSerializer(cards, many=True).data})
 
     @action(detail=True, methods=['post'],serializer_class=EmptySerializer)
     def transcribe(self, request, pk=None):
         try:
             lecture = self.get_object()
             print('my object is',lecture)
-            if lecture.status == 'In progress':
+            if lecture.status == LectureStatus.IN_PROGRESS:
                 return Response({'status': 'Transcription already in progress'}, status=status.HTTP_202_ACCEPTED)
             
-            transcribe_audio.delay(lecture.id)
+            # Shrink the upload first; transcription falls back to the original file.
+            chain(
+                normalize_audio.si(lecture.id).set(priority=PRIORITY_INTERACTIVE),
+                transcribe_audio.si(lecture.id).set(priority=PRIORITY_INTERACTIVE),
+            ).delay()
             return Response({'status': 'Transcription started'}, status=status.HTTP_202_ACCEPTED)
         
         except AudioLecture.DoesNotExist:
@@ -32,19 +163,199 @@ class AudioLectureViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def summarize(self, request, pk=None):
-        summarize_transcript.delay(pk)
+        lecture = self.get_object()
+        summarize_transcript.apply_async((lecture.id,), priority=PRIORITY_INTERACTIVE)
         return Response({'status': 'summary generation started'})
 
     @action(detail=True, methods=['post'])
     def export_pdf(self, request, pk=None):
-        export_summary_to_pdf.delay(pk)
-        return Response({'status': 'pdf export started'})
+        """
+        Exports the summary; ?include=flashcards,transcript adds those sections.
+        """
+        lecture = self.get_object()
+        include = [s.strip() for s in request.query_params.get('include', '').split(',') if s.strip()]
+        sections = pdf_sections(['summary', *include])
+        export_summary_to_pdf.apply_async((lecture.id,), {'sections': list(sections)}, priority=PRIORITY_INTERACTIVE)
+        return Response({'status': 'pdf export started', 'sections': sections})
 
     @action(detail=True, methods=['post'],serializer_class=EmptySerializer)
     def generate_flashcards(self, request, pk=None):
-        task = generate_flashcards.delay(pk)
+        lecture = self.get_object()
+        task = generate_flashcards.apply_async((lecture.id,), priority=PRIORITY_INTERACTIVE)
         return Response({'status': 'flashcard generation started', 'task_id': task.id})
 
+    @action(detail=True, methods=['post'], serializer_class=EmptySerializer)
+    def process(self, request, pk=None):
+        """
+        Runs transcription, summary, flashcards and PDF export as one workflow.
+        A running workflow blocks a new one unless it has stalled for
+        WORKFLOW_STALE_SECONDS or ?force=1 is given.
+        """
+        lecture = self.get_object()
+        workflow = lecture.workflows.filter(status='running').order_by('-created_at').first()
+        force = request.query_params.get('force') == '1'
+        if workflow and not abandon_if_stale(workflow, force=force):
+            return Response({'status': 'Workflow already running', 'workflow_id': workflow.id},
+                            status=status.HTTP_202_ACCEPTED)
+
+        workflow = start_lecture_workflow(lecture)
+        return Response({'status': 'Workflow started', 'workflow_id': workflow.id},
+                        status=status.HTTP_202_ACCEPTED)
+
+
+class LectureWorkflowViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = LectureWorkflowSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            LectureWorkflow.objects.filter(lecture__user=self.request.user)
+            .select_related('lecture')
+            .prefetch_related('stages')
+            .order_by('-created_at')
+        )
+
+
+class ReviewViewSet(viewsets.GenericViewSet):
+    """
+    Spaced-repetition study across all of a user's lectures: GET due/ for
+    the next cards, POST a batch of {"card", "grade"} results (SM-2 grades 0-5).
+    """
+    serializer_class = ReviewBatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Flashcard.objects.none()
+        return Flashcard.objects.filter(user=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def due(self, request):
+        """
+        Cards due by the end of today, most overdue first (?limit=).
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', settings.REVIEW_DUE_LIMIT)), settings.REVIEW_DUE_MAX)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        # Works with and without USE_TZ; localtime() rejects naive datetimes
+        now = timezone.now()
+        if timezone.is_aware(now):
+            now = timezone.localtime(now)
+        end_of_day = datetime.combine(now.date(), dt_time.max, tzinfo=now.tzinfo)
+        # Served by the (user, due_at) index; the lecture title comes from the same query
+        cards = (
+            self.get_queryset().filter(due_at__lte=end_of_day)
+            .select_related('lecture').order_by('due_at')[:max(limit, 0)]
+        )
+        data = FlashcardSerializer(cards, many=True).data
+        return Response({'count': len(data), 'cards': data})
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        grades = {r['card']: r['grade'] for r in serializer.validated_data['reviews']}
+
+        cards = list(self.get_queryset().filter(id__in=grades).select_related('lecture'))
+        unknown = sorted(set(grades) - {card.id for card in cards})
+        if unknown:
+            return Response({'error': 'Unknown cards', 'cards': unknown}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        for card in cards:
+            scheduler.review(card, grades[card.id], now)
+        Flashcard.objects.bulk_update(cards, scheduler.SCHEDULE_FIELDS)
+        return Response({'reviewed': len(cards), 'cards': FlashcardSerializer(cards, many=True).data})
+
+
+class UploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    """
+    Resumable uploads: create a session, PUT each part to its URL (in any
+    order, in parallel), GET the session to see which parts are still
+    missing, then POST complete. The lecture appears once the parts have
+    been assembled and hashed.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return UploadSession.objects.none()
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def session_data(self, session, parts=None):
+        data = UploadSessionSerializer(session).data
+        if session.status == 'uploading':
+            store = get_part_store()
+            if parts is None:
+                parts = missing_parts(session, store.received_parts(session))
+            data['missing_parts'] = parts
+            # URLs are issued fresh so a resumed upload never holds expired ones
+            data['parts'] = [{'number': n, 'url': store.part_url(session, n, self.request)} for n in parts]
+        return data
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = serializer.save(user=request.user, part_size=settings.UPLOAD_PART_SIZE)
+        session.key = f"uploads/{session.id}/{session.filename}"
+        session.backend_upload_id = get_part_store().start(session)
+        session.save(update_fields=['key', 'backend_upload_id'])
+        parts = list(range(1, session.part_count + 1))
+        return Response(self.session_data(session, parts), status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.session_data(self.get_object()))
+
+    def perform_destroy(self, session):
+        if session.status in ('uploading', 'failed'):
+            get_part_store().discard(session)
+        session.delete()
+
+    @action(detail=True, methods=['put'], url_path=r'parts/(?P<number>\d+)', parser_classes=[RawPartParser])
+    def part(self, request, pk=None, number=None):
+        store = get_part_store()
+        if not isinstance(store, LocalPartStore):
+            return Response({'error': 'Parts go to the presigned URLs'}, status=status.HTTP_404_NOT_FOUND)
+        session = self.get_object()
+        number = int(number)
+        if session.status != 'uploading' or not 1 <= number <= session.part_count:
+            return Response({'error': 'No such part'}, status=status.HTTP_400_BAD_REQUEST)
+        if not hasattr(request.data, 'read'):
+            # DRF skips the parser for an empty body and hands over an empty dict
+            return Response({'error': 'Empty part'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            etag = store.write_part(session, number, request.data)
+        except PartTooLarge as e:
+            return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return Response({'number': number, 'etag': etag}, headers={'ETag': f'"{etag}"'})
+
+    @action(detail=True, methods=['post'], serializer_class=EmptySerializer)
+    def complete(self, request, pk=None):
+        session = self.get_object()
+        if session.status != 'uploading':
+            return Response(self.session_data(session), status=status.HTTP_409_CONFLICT)
+        store = get_part_store()
+        missing = missing_parts(session, store.received_parts(session))
+        if missing:
+            return Response({'error': 'Upload incomplete', 'missing_parts': missing},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Only one request may move the session on and queue the assembly
+        if not UploadSession.objects.filter(id=session.id, status='uploading').update(status='finalizing'):
+            return Response(self.session_data(self.get_object()), status=status.HTTP_409_CONFLICT)
+        try:
+            store.complete(session)
+        except UploadError as e:
+            UploadSession.objects.filter(id=session.id).update(status='uploading')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        finalize_upload.apply_async((str(session.id),), priority=PRIORITY_INTERACTIVE)
+        session.status = 'finalizing'
+        return Response(self.session_data(session), status=status.HTTP_202_ACCEPTED)
+
+
 class RegisterUserView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
@@ -61,4 +372,70 @@ class RegisterUserView(generics.CreateAPIView):
                 },
                 "tokens": serializer.data['tokens']
             }, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """
+    Hit and miss counters of the transcript/summary/flashcards result cache.
+    """
+    return Response(result_cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def rate_limit_levels(request):
+    """
+    Current fill level of the shared per-model request and token buckets.
+    """
+    return Response(ratelimit.bucket_levels())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def websocket_stats(request):
+    """
+    WebSocket messages coalesced, dropped or refused per connection, by
+    reason, and notifications queued/coalesced/sent per worker task.
+    """
+    return Response({
+        'drops': events.drop_stats(),
+        'notifications': events.task_count_stats(),
+    })
+
+
+def media_download(request, token):
+    """
+    Serves a locally stored media file behind a signed, expiring link. With
+    MEDIA_ACCEL_REDIRECT_PREFIX set, nginx streams the file and Django only
+    checks the signature.
+    """
+    name = unsign_media_name(token)
+    if not name or not default_storage.exists(name):
+        raise Http404('Link expired or file not found')
+    filename = os.path.basename(name)
+    prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX
+    if prefix:
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + name
+        del response['Content-Type']  # let nginx pick it from the file
+    else:
+        response = FileResponse(default_storage.open(name, 'rb'))
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    return response
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. With METRICS_TOKEN set, scrapers must send
+    it as a bearer token; without one it is only served with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse(status=403)
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    body, content_type = metrics.exposition()
+    return HttpResponse(body, content_type=content_type)
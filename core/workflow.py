@@ -0,0 +1,155 @@
+import logging
+
+from datetime import timedelta
+
+from celery.signals import task_failure, task_postrun, task_prerun
+from django.conf import settings
+from django.utils import timezone
+
+from . import cache as result_cache
+from .models import AudioLecture, LectureWorkflow, WorkflowStage
+from .pdf import DEFAULT_SECTIONS, pdf_name
+from .summarization import cache_signature
+
+logger = logging.getLogger(__name__)
+
+# Returned by a stage task that found its output already in place.
+STAGE_SKIPPED = "skipped"
+
+STAGES = ["normalize", "transcribe", "summarize", "flashcards", "pdf"]
+# Stages whose failure does not stop the pipeline (transcription falls back
+# to the original upload), so they are recorded as skipped instead.
+OPTIONAL_STAGES = {"normalize"}
+STAGE_TASKS = {
+    "core.tasks.normalize_audio": "normalize",
+    "core.tasks.transcribe_audio": "transcribe",
+    "core.tasks.summarize_transcript": "summarize",
+    "core.tasks.generate_flashcards": "flashcards",
+    "core.tasks.export_summary_to_pdf": "pdf",
+}
+
+
+def create_workflow(lecture):
+    workflow = LectureWorkflow.objects.create(lecture=lecture)
+    WorkflowStage.objects.bulk_create([
+        WorkflowStage(workflow=workflow, name=name, order=i)
+        for i, name in enumerate(STAGES)
+    ])
+    return workflow
+
+
+def stage_completed(lecture, stage, workflow_id=None):
+    """
+    Whether the lecture already holds a valid output for the stage. Used to
+    skip work on re-runs and to judge whether a stage task really succeeded,
+    since several tasks report errors without raising.
+    """
+    if stage == "normalize":
+        return bool(lecture.normalized_audio_file) or bool(lecture.transcript)
+    if stage == "transcribe":
+        return bool(lecture.transcript)
+    if stage == "summarize":
+        # summary may hold an error message; only a cached result is a real summary
+        return bool(lecture.summary) and bool(lecture.transcript) and result_cache.contains(
+            "summary", result_cache.text_sha256(lecture.transcript), cache_signature(), settings.LLM_MODEL
+        )
+    if stage == "flashcards":
+        return lecture.cards.exists()
+    if stage == "pdf":
+        # The file name is a hash of the rendered content, so a regenerated
+        # summary no longer matches it
+        return bool(lecture.pdf_file) and lecture.pdf_file.name == pdf_name(lecture, DEFAULT_SECTIONS)
+    return False
+
+
+def _stage_call(task, args, kwargs):
+    stage = STAGE_TASKS.get(task.name) if task else None
+    workflow_id = (kwargs or {}).get("workflow_id")
+    if not stage or not workflow_id:
+        return None, None
+    return stage, workflow_id
+
+
+def _update_stage(workflow_id, stage, **fields):
+    WorkflowStage.objects.filter(workflow_id=workflow_id, name=stage).update(**fields)
+
+
+@task_prerun.connect
+def stage_started(sender=None, task=None, args=None, kwargs=None, **extra):
+    stage, workflow_id = _stage_call(task, args, kwargs)
+    if not stage:
+        return
+    # Retries keep the original start time so durations cover the whole stage
+    WorkflowStage.objects.filter(
+        workflow_id=workflow_id, name=stage, started_at__isnull=True
+    ).update(started_at=timezone.now())
+    _update_stage(workflow_id, stage, status="running")
+
+
+@task_postrun.connect
+def stage_finished(sender=None, task=None, args=None, kwargs=None, retval=None, state=None, **extra):
+    stage, workflow_id = _stage_call(task, args, kwargs)
+    if not stage or state != "SUCCESS":
+        return
+    if retval == STAGE_SKIPPED:
+        _update_stage(workflow_id, stage, status="skipped", finished_at=timezone.now())
+        return
+
+    lecture = AudioLecture.objects.filter(id=args[0]).first()
+    if lecture and stage_completed(lecture, stage):
+        _update_stage(workflow_id, stage, status="succeeded", finished_at=timezone.now())
+    elif stage in OPTIONAL_STAGES:
+        _update_stage(workflow_id, stage, status="skipped", finished_at=timezone.now(),
+                      error="Stage produced no output; continuing without it")
+    else:
+        _update_stage(workflow_id, stage, status="failed", finished_at=timezone.now(),
+                      error="Stage finished without producing output")
+
+
+@task_failure.connect
+def stage_failed(sender=None, exception=None, args=None, kwargs=None, **extra):
+    stage, workflow_id = _stage_call(sender, args, kwargs)
+    if not stage:
+        return
+    _update_stage(workflow_id, stage, status="failed", finished_at=timezone.now(), error=str(exception))
+
+
+def finish_workflow(workflow_id):
+    workflow = LectureWorkflow.objects.filter(id=workflow_id).first()
+    if not workflow:
+        return None
+    failed = workflow.stages.exclude(status__in=["succeeded", "skipped"]).exists()
+    workflow.status = "failed" if failed else "succeeded"
+    workflow.finished_at = timezone.now()
+    workflow.save(update_fields=["status", "finished_at"])
+    logger.info(f"Workflow {workflow_id} for lecture {workflow.lecture_id} {workflow.status}")
+    return workflow.status
+
+
+def last_activity(workflow):
+    """
+    When the workflow or any of its stages last changed.
+    """
+    times = [workflow.created_at]
+    for stage in workflow.stages.all():
+        times.extend(t for t in (stage.started_at, stage.finished_at) if t)
+    return max(times)
+
+
+def abandon_if_stale(workflow, force=False):
+    """
+    Marks a running workflow failed when nothing has happened in it for
+    WORKFLOW_STALE_SECONDS (or when forced), so the lecture can be processed
+    again. A lost message or killed worker never reaches complete_workflow.
+    Returns whether the workflow was abandoned.
+    """
+    now = timezone.now()
+    idle = now - last_activity(workflow)
+    if not force and idle < timedelta(seconds=settings.WORKFLOW_STALE_SECONDS):
+        return False
+    reason = "Restarted by request" if force else f"No progress for {int(idle.total_seconds())}s"
+    workflow.stages.filter(status__in=["pending", "running"]).update(
+        status="failed", finished_at=now, error=f"Abandoned: {reason}")
+    LectureWorkflow.objects.filter(id=workflow.id, status="running").update(status="failed", finished_at=now)
+    logger.warning(f"Workflow {workflow.id} for lecture {workflow.lecture_id} abandoned: {reason}")
+    return True
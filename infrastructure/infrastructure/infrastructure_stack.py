@@ -197,8 +197,7 @@ class StudyAppStack(Stack):
     # ---------------- LOAD BALANCER ---------------- #
 
     def create_load_balancer(self, domain_name):
-        # No longer creating a load balancer
-        pass
+        # The ALB is created with the web service it fronts, in create_services
         self.alb = None
         self.listener = None
 
@@ -228,38 +227,11 @@ class StudyAppStack(Stack):
 
     # ---------------- SERVICES ---------------- #
 
-    def create_celery_worker(self):
-        return self.create_task_def(
-            "CeleryWorker",
-            [
-                "celery", "-A", "study_app", "worker",
-                "--loglevel=info",
-                "--concurrency=2",
-                "--task-soft-time-limit=300",
-                "--task-time-limit=600",
-                "--without-heartbeat",
-                "--without-mingle",
-                "--without-gossip"
-            ],
-            environment={
-                "CELERY_BROKER_URL": f"redis://{self.redis.attr_redis_endpoint_address}:6379/0",
-                "CELERY_RESULT_BACKEND": f"redis://{self.redis.attr_redis_endpoint_address}:6379/1",
-                "CELERYD_PREFETCH_MULTIPLIER": "1",
-                "CELERY_ACKS_LATE": "True",
-                "CELERYD_MAX_TASKS_PER_CHILD": "100",
-                "DB_HOST": self.db.db_instance_endpoint_address,
-                "DB_NAME": "studyappdb",
-                "DB_USER": "postgres",
-                "REDIS_HOST": self.redis.attr_redis_endpoint_address,
-                "ENV": self.env_name,
-            }
-        )
-
-    def create_task_def(self, name, command, environment=None):
+    def create_task_def(self, name, command, environment=None, cpu=256):
         task = ecs.FargateTaskDefinition(
             self,
             name,
-            cpu=256,
+            cpu=cpu,
             memory_limit_mib=1024,  # Increased for better performance
             execution_role=self.execution_role,
             task_role=self.task_role,
@@ -324,47 +296,43 @@ class StudyAppStack(Stack):
         
         return task
 
-    def create_celery_worker(self):
+    def create_celery_worker(self, name, queues, pool, concurrency, cpu=256):
+        """
+        Worker task definition consuming the given queues. I/O-bound tasks run
+        on a thread pool so a handful of containers can keep many Groq calls
+        in flight; CPU-bound tasks keep prefork processes.
+        """
         return self.create_task_def(
-            "CeleryWorker",
+            name,
             [
                 "celery", "-A", "study_app", "worker",
                 "--loglevel=info",
-                "--concurrency=2",
-                "--task-soft-time-limit=300",
-                "--task-time-limit=600",
+                f"--queues={queues}",
+                f"--pool={pool}",
+                f"--concurrency={concurrency}",
+                "--prefetch-multiplier=1",
+                "--task-soft-time-limit=900",
+                "--task-time-limit=1200",
                 "--without-heartbeat",
                 "--without-mingle",
                 "--without-gossip"
             ],
             environment={
-                "CELERY_BROKER_URL": f"redis://{self.redis.attr_redis_endpoint_address}:6379/1",
-                "CELERY_RESULT_BACKEND": f"redis://{self.redis.attr_redis_endpoint_address}:6379/2",
+                "CELERY_BROKER_URL": f"redis://{self.redis.attr_redis_endpoint_address}:6379/0",
+                "CELERY_RESULT_BACKEND": f"redis://{self.redis.attr_redis_endpoint_address}:6379/1",
+                "CELERYD_PREFETCH_MULTIPLIER": "1",
+                "CELERY_ACKS_LATE": "True",
+                "CELERYD_MAX_TASKS_PER_CHILD": "100",
                 "DB_HOST": self.db.db_instance_endpoint_address,
                 "DB_NAME": "studyappdb",
                 "DB_USER": "postgres",
                 "REDIS_HOST": self.redis.attr_redis_endpoint_address,
                 "ENV": self.env_name,
-            }
+            },
+            cpu=cpu,
         )
 
     def create_services(self):
-        # Create a target group for the load balancer
-        target_group = elbv2.ApplicationTargetGroup(
-            self, "WebTargetGroup",
-            port=80,
-            protocol=elbv2.ApplicationProtocol.HTTP,
-            target_type=elbv2.TargetType.IP,
-            vpc=self.vpc,
-            health_check=elbv2.HealthCheck(
-                path="/health/",
-                healthy_threshold_count=2,
-                unhealthy_threshold_count=2,
-                timeout=Duration.seconds(5),
-                interval=Duration.seconds(30)
-            )
-        )
-
         # Web Service with Daphne for WebSocket support
         web_task = self.create_task_def(
             "WebTask",
@@ -389,141 +357,26 @@ class StudyAppStack(Stack):
             }
         )
 
-        # Create Celery worker service
-        celery_task = self.create_celery_worker()
-        
-        # Create Celery service
-        celery_service = ecs.FargateService(
+        # Network-bound tasks (transcription, summaries, flashcards) on threads
+        io_task = self.create_celery_worker("CeleryIoWorker", "io", "threads", 16)
+        # PDF export and audio processing on processes, plus the default queue
+        cpu_task = self.create_celery_worker("CeleryCpuWorker", "cpu,celery", "prefork", 2, cpu=512)
+
+        self.celery_io_service = ecs.FargateService(
             self,
-            "CeleryService",
+            "CeleryIoService",
             cluster=self.cluster,
-            task_definition=celery_task,
+            task_definition=io_task,
             desired_count=1,
             security_groups=[self.app_sg],
             vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
         )
-        
-        # Create the web service with health check settings
-        web_service = ecs.FargateService(
-            self,
-            "WebService",
-            cluster=self.cluster,
-            task_definition=web_task,
-            desired_count=1,
-            security_groups=[self.app_sg],
-            assign_public_ip=True,
-            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PUBLIC),
-            health_check_grace_period=Duration.minutes(5),
-        )
-        
-        # Add the web service to the target group
-        web_service.attach_to_application_target_group(target_group)
-        
-        # Create Application Load Balancer with WebSocket support
-        self.alb = elbv2.ApplicationLoadBalancer(
-            self, "StudyAppALB",
-            vpc=self.vpc,
-            internet_facing=True,
-            security_group=self.app_sg,
-        )
-        
-        # Add HTTP listener with WebSocket upgrade support
-        http_listener = self.alb.add_listener(
-            "HttpListener",
-            port=80,
-            open=True
-        )
-        
-        # Add default action to forward to the target group
-        http_listener.add_action(
-            "WebSocketUpgradeAction",
-            priority=100,
-            conditions=[elbv2.ListenerCondition.http_header("Upgrade", ["websocket"])],
-            action=elbv2.ListenerAction.forward([target_group])
-        )
-        
-        # Add default action for regular HTTP traffic
-        http_listener.add_action(
-            "DefaultAction",
-            action=elbv2.ListenerAction.forward([target_group])
-        )
-        
-        # Auto Scaling - optional, adjust as needed
-        scaling = web_service.auto_scale_task_count(
-            min_capacity=1,
-            max_capacity=3 if self.is_prod else 1,
-        )
-        
-        scaling.scale_on_cpu_utilization(
-            "CpuScaling",
-            target_utilization_percent=70,
-            scale_in_cooldown=Duration.seconds(300),
-            scale_out_cooldown=Duration.seconds(300),
-        )
 
-# ---------------- SERVICES ---------------- #
-
-    def create_celery_worker(self):
-        return self.create_task_def(
-            "CeleryWorker",
-            [
-                "celery", "-A", "study_app", "worker",
-                "--loglevel=info",
-                "--concurrency=2",
-                "--task-soft-time-limit=300",
-                "--task-time-limit=600",
-                "--without-heartbeat",
-                "--without-mingle",
-                "--without-gossip"
-            ],
-            environment={
-                "CELERY_BROKER_URL": f"redis://{self.redis.attr_redis_endpoint_address}:6379/0",
-                "CELERY_RESULT_BACKEND": f"redis://{self.redis.attr_redis_endpoint_address}:6379/1",
-                "CELERYD_PREFETCH_MULTIPLIER": "1",
-                "CELERY_ACKS_LATE": "True",
-                "CELERYD_MAX_TASKS_PER_CHILD": "100",
-                "DB_HOST": self.db.db_instance_endpoint_address,
-                "DB_NAME": "studyappdb",
-                "DB_USER": "postgres",
-                "REDIS_HOST": self.redis.attr_redis_endpoint_address,
-                "ENV": self.env_name,
-            }
-        )
-
-    def create_services(self):
-        # Web Service with Daphne for WebSocket support
-        web_task = self.create_task_def(
-            "WebTask",
-            [
-                "daphne",
-                "-b", "0.0.0.0",
-                "-p", "8000",
-                "--proxy-headers",
-                "study_app.asgi:application"
-            ],
-            environment={
-                "REDIS_URL": f"redis://{self.redis.attr_redis_endpoint_address}:6379/0",
-                "CELERY_BROKER_URL": f"redis://{self.redis.attr_redis_endpoint_address}:6379/1",
-                "CHANNEL_LAYERS": json.dumps({
-                    "default": {
-                        "BACKEND": "channels_redis.core.RedisChannelLayer",
-                        "CONFIG": {
-                            "hosts": [(self.redis.attr_redis_endpoint_address, 6379)],
-                        },
-                    },
-                }),
-            }
-        )
-
-        # Create Celery worker service
-        celery_task = self.create_celery_worker()
-        
-        # Create Celery service
-        self.celery_service = ecs.FargateService(
+        self.celery_cpu_service = ecs.FargateService(
             self,
-            "CeleryService",
+            "CeleryCpuService",
             cluster=self.cluster,
-            task_definition=celery_task,
+            task_definition=cpu_task,
             desired_count=1,
             security_groups=[self.app_sg],
             vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
@@ -546,13 +399,52 @@ class StudyAppStack(Stack):
                 cloud_map_namespace=self.namespace
             )
         )
-        
+
+        target_group = elbv2.ApplicationTargetGroup(
+            self, "WebTargetGroup",
+            port=8000,
+            protocol=elbv2.ApplicationProtocol.HTTP,
+            target_type=elbv2.TargetType.IP,
+            vpc=self.vpc,
+            health_check=elbv2.HealthCheck(
+                # Readiness, so tasks that lost the database or Redis stop getting traffic
+                path="/ready/",
+                healthy_threshold_count=2,
+                unhealthy_threshold_count=2,
+                timeout=Duration.seconds(5),
+                interval=Duration.seconds(30)
+            )
+        )
+        self.web_service.attach_to_application_target_group(target_group)
+
+        # Internet-facing ALB in front of the private web tasks (HTTP + WebSockets)
+        self.alb = elbv2.ApplicationLoadBalancer(
+            self, "StudyAppALB",
+            vpc=self.vpc,
+            internet_facing=True,
+            security_group=self.app_sg,
+        )
+        self.listener = self.alb.add_listener(
+            "HttpListener",
+            port=80,
+            open=True,
+            default_action=elbv2.ListenerAction.forward([target_group]),
+        )
+        # Metrics are scraped from the tasks inside the VPC, not through the ALB
+        self.listener.add_action(
+            "DenyMetrics",
+            priority=10,
+            conditions=[elbv2.ListenerCondition.path_patterns(["/metrics"])],
+            action=elbv2.ListenerAction.fixed_response(404),
+        )
+
     def create_outputs(self):
         # Core infrastructure outputs
         outputs = {
             "DBEndpoint": self.db.db_instance_endpoint_address,
             "RedisEndpoint": self.redis.attr_redis_endpoint_address,
-            "BucketName": self.bucket.bucket_name
+            "BucketName": self.bucket.bucket_name,
+            "LoadBalancerDNS": self.alb.load_balancer_dns_name if self.alb else None,
         }
 
         # Add API Gateway endpoint if it exists
@@ -1,16 +1,20 @@
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-from core import routing
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "study_app.settings")
 
+# Set up Django before importing the consumers, which import models
 django_asgi_app = get_asgi_application()
 
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.auth import AuthMiddlewareStack
+from core import routing
+from core.middleware import JWTAuthMiddleware
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
+    # A bearer token (as for the REST API) takes precedence over the session
     "websocket": AuthMiddlewareStack(
-        URLRouter(routing.websocket_urlpatterns)
+        JWTAuthMiddleware(URLRouter(routing.websocket_urlpatterns))
     ),
 })
@@ -1,7 +1,8 @@
-from django.contrib import admin
-from django.urls import path, include
+from django.urls import path
+
+from .views import health, ready
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
-    path("health/", include("healthcheck.urls")),
+    path("health/", health, name="health"),
+    path("ready/", ready, name="ready"),
 ]
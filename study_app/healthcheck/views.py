@@ -1,4 +1,145 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import redis
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import connection
 from django.http import JsonResponse
+from kombu.exceptions import ChannelError
+
+from study_app.celery import app
+
 
 def health(request):
+    """
+    Liveness: the process is up and serving requests. Touches no dependency.
+    """
     return JsonResponse({"status": "ok"})
+
+
+def check_database():
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    finally:
+        # Checks run on throwaway threads; don't leave their connections open
+        connection.close()
+
+
+_redis = None
+
+
+def check_redis():
+    global _redis
+    if _redis is None:
+        # A client of its own so an unreachable server fails within READY_TIMEOUT
+        _redis = redis.Redis.from_url(
+            settings.REDIS_URL, socket_connect_timeout=settings.READY_TIMEOUT,
+            socket_timeout=settings.READY_TIMEOUT,
+        )
+    _redis.ping()
+
+
+async def channel_round_trip():
+    # A plain (not process-local) channel, so this never shares the receive
+    # machinery of the WebSocket consumers in this process
+    layer = get_channel_layer()
+    channel = f"ready.{uuid.uuid4().hex}"
+
+    async def send_and_receive():
+        await layer.send(channel, {"type": "ready.ping"})
+        await layer.receive(channel)
+    await asyncio.wait_for(send_and_receive(), settings.READY_TIMEOUT)
+
+
+def check_channel_layer():
+    async_to_sync(channel_round_trip)()
+
+
+def broker_queues():
+    routes = settings.CELERY_TASK_ROUTES.values()
+    return sorted({settings.CELERY_TASK_DEFAULT_QUEUE} | {route["queue"] for route in routes})
+
+
+def check_broker():
+    """
+    Returns the number of messages waiting in each task queue.
+    """
+    depths = {}
+    with app.connection_for_read() as conn:
+        conn.ensure_connection(max_retries=1, interval_start=0, timeout=settings.READY_TIMEOUT)
+        channel = conn.default_channel
+        for queue in broker_queues():
+            try:
+                depths[queue] = channel.queue_declare(queue=queue, passive=True).message_count
+            except ChannelError:
+                depths[queue] = 0  # nothing was ever published to it
+    return {"queues": depths}
+
+
+CHECKS = {
+    "database": check_database,
+    "redis": check_redis,
+    "channel_layer": check_channel_layer,
+    "broker": check_broker,
+}
+
+_cached = None
+_cached_at = 0.0
+_lock = threading.Lock()
+
+
+def timed_check(check):
+    start = time.perf_counter()
+    try:
+        detail = check() or {}
+        result = {"ok": True, **detail}
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def run_checks():
+    """
+    Runs every check at once and waits READY_TIMEOUT seconds in total, so a
+    slow dependency can't push the response past the load balancer's
+    timeout. Checks still running then are reported as timed out.
+    """
+    executor = ThreadPoolExecutor(max_workers=len(CHECKS), thread_name_prefix="ready")
+    futures = {name: executor.submit(timed_check, check) for name, check in CHECKS.items()}
+    wait(futures.values(), timeout=settings.READY_TIMEOUT)
+    # Don't wait for stragglers; they end on their own client timeouts
+    executor.shutdown(wait=False)
+    results = {}
+    for name, future in futures.items():
+        if future.done():
+            results[name] = future.result()
+        else:
+            results[name] = {"ok": False, "error": f"timed out after {settings.READY_TIMEOUT}s"}
+    return results
+
+
+def ready(request):
+    """
+    Readiness: database, Redis, channel layer and Celery broker are
+    reachable. Results are reused for READY_CACHE_SECONDS and only one
+    request at a time runs the checks, so a burst of probes costs the
+    dependencies one round of queries.
+    """
+    global _cached, _cached_at
+    with _lock:
+        age = time.time() - _cached_at
+        if _cached is None or age >= settings.READY_CACHE_SECONDS:
+            _cached, _cached_at, age = run_checks(), time.time(), 0.0
+        checks = _cached
+    ok = all(result["ok"] for result in checks.values())
+    return JsonResponse(
+        {"status": "ok" if ok else "unavailable", "age_s": round(age, 1), "checks": checks},
+        status=200 if ok else 503,
+    )
@@ -1,4 +1,6 @@
 import os
+import json
+import django
 from pathlib import Path
 from datetime import timedelta
 from decouple import config, Csv
@@ -14,8 +16,80 @@ ALLOWED_HOSTS = config("ALLOWED_HOSTS", default="localhost,127.0.0.1,10.0.2.2",
 
 GROQ_API_KEY = config("GROQ_API_KEY", default="")
 GROQ_API_BASE = config("GROQ_API_BASE", default="https://api.groq.com/openai/v1")
-CELERY_BROKER_URL = config("REDIS_URL", default="redis://redis:6379/0")
-    
+LLM_MODEL = config("LLM_MODEL", default="llama-3.3-70b-versatile")
+GROQ_CONNECT_TIMEOUT = config("GROQ_CONNECT_TIMEOUT", default=5, cast=int)
+GROQ_READ_TIMEOUT = config("GROQ_READ_TIMEOUT", default=60, cast=int)
+GROQ_MAX_RETRIES = config("GROQ_MAX_RETRIES", default=4, cast=int)
+GROQ_POOL_SIZE = config("GROQ_POOL_SIZE", default=32, cast=int)  # shared by all threads of an io worker
+# Longest Retry-After a call sleeps through; a longer 429 reschedules the task
+GROQ_MAX_RETRY_AFTER = config("GROQ_MAX_RETRY_AFTER", default=30, cast=float)
+
+# Shared per-model request/token budgets enforced across all Celery workers.
+# A model missing from the map (or a limit of 0) is not throttled.
+LLM_RATE_LIMITS = config(
+    "LLM_RATE_LIMITS",
+    default='{"llama-3.3-70b-versatile": {"rpm": 30, "tpm": 12000}, "whisper-large-v3-turbo": {"rpm": 20}}',
+    cast=json.loads,
+)
+# How long a call may wait for capacity before its task is rescheduled
+RATE_LIMIT_MAX_WAIT = config("RATE_LIMIT_MAX_WAIT", default=5, cast=float)
+
+# Summaries: transcripts over the chunk budget are summarized map-reduce style
+SUMMARY_CHUNK_TOKENS = config("SUMMARY_CHUNK_TOKENS", default=6000, cast=int)
+SUMMARY_MAX_WORKERS = config("SUMMARY_MAX_WORKERS", default=4, cast=int)
+# Flashcard prompts are cut to this budget; workflows summarize longer
+# transcripts first and make the cards from the summary
+FLASHCARDS_INPUT_TOKENS = config("FLASHCARDS_INPUT_TOKENS", default=6000, cast=int)
+# A running workflow whose stages have not changed for this long is taken to
+# be lost (killed worker, dropped message) and may be started again
+WORKFLOW_STALE_SECONDS = config("WORKFLOW_STALE_SECONDS", default=3600, cast=int)
+# tiktoken encoding used to count tokens; without tiktoken, length is used
+TOKENIZER_ENCODING = config("TOKENIZER_ENCODING", default="cl100k_base")
+# Per-lecture WebSocket event log that reconnecting clients replay from
+EVENT_LOG_SIZE = config("EVENT_LOG_SIZE", default=200, cast=int)
+EVENT_LOG_TTL = config("EVENT_LOG_TTL", default=86400, cast=int)
+# WebSocket limits per connection: inbound messages/second and burst, the
+# largest accepted frame, and how many outbound events may queue up
+WS_RATE_LIMIT = config("WS_RATE_LIMIT", default=5, cast=float)
+WS_RATE_BURST = config("WS_RATE_BURST", default=20, cast=int)
+WS_MAX_FRAME_BYTES = config("WS_MAX_FRAME_BYTES", default=16384, cast=int)
+WS_OUTBOX_SIZE = config("WS_OUTBOX_SIZE", default=100, cast=int)
+# Worker-side WebSocket events are buffered this long per group and sent as a batch
+NOTIFY_COALESCE_MS = config("NOTIFY_COALESCE_MS", default=50, cast=int)
+# Streamed completions are forwarded to the WebSocket in batches this far apart
+STREAM_FLUSH_INTERVAL = config("STREAM_FLUSH_INTERVAL", default=0.1, cast=float)
+
+# Transcription pipeline: long recordings are split into overlapping windows
+# that are transcribed concurrently and stitched back together.
+TRANSCRIPTION_MODEL = config("TRANSCRIPTION_MODEL", default="whisper-large-v3-turbo")
+TRANSCRIBE_CHUNK_SECONDS = config("TRANSCRIBE_CHUNK_SECONDS", default=600, cast=int)
+TRANSCRIBE_CHUNK_OVERLAP_SECONDS = config("TRANSCRIBE_CHUNK_OVERLAP_SECONDS", default=5, cast=int)
+TRANSCRIBE_MAX_WORKERS = config("TRANSCRIBE_MAX_WORKERS", default=4, cast=int)
+TRANSCRIBE_CHUNK_ATTEMPTS = config("TRANSCRIBE_CHUNK_ATTEMPTS", default=3, cast=int)
+TRANSCRIBE_REQUEST_TIMEOUT = config("TRANSCRIBE_REQUEST_TIMEOUT", default=120, cast=int)
+
+# Transcripts/summaries/flashcards at least this large are stored zlib-compressed
+ARTIFACT_COMPRESSION = config("ARTIFACT_COMPRESSION", default=True, cast=bool)
+ARTIFACT_COMPRESS_MIN_BYTES = config("ARTIFACT_COMPRESS_MIN_BYTES", default=2048, cast=int)
+
+# Flashcard review: cards returned by /api/review/due/ (default and cap) and
+# the most reviews accepted in one submission
+REVIEW_DUE_LIMIT = config("REVIEW_DUE_LIMIT", default=20, cast=int)
+REVIEW_DUE_MAX = config("REVIEW_DUE_MAX", default=100, cast=int)
+REVIEW_BATCH_MAX = config("REVIEW_BATCH_MAX", default=200, cast=int)
+# Bearer token required by /metrics (without one it is only served when
+# DEBUG is on) and the port Celery workers serve their metrics on (0 disables it)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+METRICS_WORKER_PORT = config("METRICS_WORKER_PORT", default=9808, cast=int)
+# /ready/ reuses its dependency checks for this long; they run concurrently
+# and all give up after READY_TIMEOUT seconds (keep it under the 5s ALB
+# health check timeout)
+READY_CACHE_SECONDS = config("READY_CACHE_SECONDS", default=5, cast=float)
+READY_TIMEOUT = config("READY_TIMEOUT", default=2, cast=float)
+
+REDIS_URL = config("REDIS_URL", default="redis://redis:6379/0")
+CELERY_BROKER_URL = REDIS_URL
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -41,6 +115,7 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -88,12 +163,86 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_ROOT = config("MEDIA_ROOT", default=os.path.join(BASE_DIR, 'media'))
+
+# Where uploads, normalized audio and PDFs live: "local" (MEDIA_ROOT) or "s3"
+# (any S3-compatible bucket via django-storages). Downloads use signed URLs
+# valid for MEDIA_URL_EXPIRY seconds; local files are handed to nginx with
+# X-Accel-Redirect from MEDIA_ACCEL_REDIRECT_PREFIX when it is set.
+MEDIA_BACKEND = config("MEDIA_BACKEND", default="local")
+MEDIA_URL_EXPIRY = config("MEDIA_URL_EXPIRY", default=3600, cast=int)
+MEDIA_ACCEL_REDIRECT_PREFIX = config("MEDIA_ACCEL_REDIRECT_PREFIX", default="")
+
+# TrueType fonts embedded in exported PDFs (fonts-dejavu-core in the image);
+# without them PDFs fall back to Latin-1 Helvetica
+PDF_FONT_PATH = config("PDF_FONT_PATH", default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+PDF_FONT_BOLD_PATH = config("PDF_FONT_BOLD_PATH", default="/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
+
+# Resumable uploads: "s3" hands out presigned multipart URLs (set
+# AWS_S3_ENDPOINT_URL for MinIO or another S3-compatible store); "local"
+# accepts the parts on this app and keeps them under MEDIA_ROOT/uploads/.
+UPLOAD_BACKEND = config("UPLOAD_BACKEND", default="local")
+UPLOAD_PART_SIZE = config("UPLOAD_PART_SIZE", default=8 * 1024 * 1024, cast=int)
+UPLOAD_MAX_BYTES = config("UPLOAD_MAX_BYTES", default=2 * 1024 ** 3, cast=int)
+UPLOAD_URL_EXPIRY = config("UPLOAD_URL_EXPIRY", default=3600, cast=int)
+AWS_ACCESS_KEY_ID = config("AWS_ACCESS_KEY_ID", default="")
+AWS_SECRET_ACCESS_KEY = config("AWS_SECRET_ACCESS_KEY", default="")
+AWS_STORAGE_BUCKET_NAME = config("AWS_STORAGE_BUCKET_NAME", default="studyapp-dev")
+AWS_REGION = config("AWS_REGION", default="us-east-1")
+AWS_S3_ENDPOINT_URL = config("AWS_S3_ENDPOINT_URL", default="")
+# Optional CDN host in front of the bucket (e.g. CloudFront)
+AWS_S3_CUSTOM_DOMAIN = config("AWS_S3_CUSTOM_DOMAIN", default="")
+
+DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
+if MEDIA_BACKEND == "s3":
+    # django-storages reads its options from these AWS_* settings
+    DEFAULT_FILE_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
+    AWS_LOCATION = "media"
+    AWS_S3_REGION_NAME = AWS_REGION
+    AWS_S3_ENDPOINT_URL = AWS_S3_ENDPOINT_URL or None
+    AWS_S3_CUSTOM_DOMAIN = AWS_S3_CUSTOM_DOMAIN or None
+    AWS_QUERYSTRING_AUTH = True
+    AWS_S3_SIGNATURE_VERSION = "s3v4"
+    AWS_QUERYSTRING_EXPIRE = MEDIA_URL_EXPIRY
+    AWS_S3_FILE_OVERWRITE = False
+    AWS_DEFAULT_ACL = None
+
+if django.VERSION >= (4, 2):
+    # Django 4.2 replaced DEFAULT_FILE_STORAGE with STORAGES and rejects both together
+    STORAGES = {
+        "default": {"BACKEND": DEFAULT_FILE_STORAGE},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+    del DEFAULT_FILE_STORAGE
 
 # Celery (use redis service name in Docker)
 CELERY_BROKER_URL = config("REDIS_URL", default="redis://redis:6379/0")
 CELERY_RESULT_BACKEND = config("CELERY_RESULT_BACKEND", default="django-db")
 
+# Network-bound tasks go to "io" (thread pool workers), CPU-bound ones to "cpu"
+# (prefork workers) so a PDF export never waits behind a long transcription.
+CELERY_TASK_DEFAULT_QUEUE = "celery"
+CELERY_TASK_ROUTES = {
+    "core.tasks.transcribe_audio": {"queue": "io"},
+    "core.tasks.summarize_transcript": {"queue": "io"},
+    "core.tasks.generate_flashcards": {"queue": "io"},
+    "core.tasks.plan_text_stages": {"queue": "io"},
+    "core.tasks.finalize_upload": {"queue": "io"},
+    "core.tasks.normalize_audio": {"queue": "cpu"},
+    "core.tasks.export_summary_to_pdf": {"queue": "cpu"},
+    "core.tasks.complete_workflow": {"queue": "cpu"},
+}
+# Redis emulates priorities with one list per step; 0 is served first.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+CELERY_TASK_DEFAULT_PRIORITY = 5
+# Tasks are long; don't let one worker hoard queued work it can't start yet
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+
 # JWT
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
@@ -119,7 +268,7 @@ CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [("redis", 6379)],  # use docker service name
+            "hosts": [REDIS_URL],  # the docker service by default
         },
     },
 }
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import routers
-from core.views import AudioLectureViewSet,RegisterUserView
+from core.views import AudioLectureViewSet,LectureWorkflowViewSet,ReviewViewSet,UploadViewSet,RegisterUserView,cache_stats,rate_limit_levels,websocket_stats,media_download,metrics_view
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework.permissions import AllowAny
@@ -14,6 +14,9 @@ from django.conf.urls.static import static
 
 router = routers.DefaultRouter()
 router.register(r'lectures', AudioLectureViewSet, basename='lecture')
+router.register(r'workflows', LectureWorkflowViewSet, basename='workflow')
+router.register(r'uploads', UploadViewSet, basename='upload')
+router.register(r'review', ReviewViewSet, basename='review')
 
 schema_view = get_schema_view(
     openapi.Info(title="Study App API", default_version='v1'),
@@ -28,6 +31,12 @@ urlpatterns = [
    path('api/register/', RegisterUserView.as_view(), name='register'),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/stats/cache/', cache_stats, name='cache_stats'),
+    path('api/stats/ratelimits/', rate_limit_levels, name='rate_limit_levels'),
+    path('api/stats/websocket/', websocket_stats, name='websocket_stats'),
+    path('api/media/<str:token>/', media_download, name='media_download'),
+    path('metrics', metrics_view, name='metrics'),
+    path('', include('study_app.healthcheck.urls')),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
 